@@ -0,0 +1,338 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+
+import pygame
+
+# ----------------- Cấu hình -----------------
+DEFAULT_BUDGET_MB = 96
+
+# Các chế độ convert:
+#   "raw"    - chỉ giải mã, chưa convert (dùng được trước khi có video mode)
+#   "opaque" - convert() cho ảnh không có kênh alpha
+#   "alpha"  - convert_alpha()
+#   "auto"   - convert_alpha() nếu ảnh gốc có alpha, ngược lại convert()
+#   "best"   - theo alpha thật của từng pixel: đục hết → convert(),
+#              chỉ 0/255 → colorkey + RLEACCEL, có alpha mờ → convert_alpha()
+MODES = ("raw", "opaque", "alpha", "auto", "best")
+
+# Màu thử làm colorkey, lấy màu đầu tiên không có trong phần ảnh nhìn thấy
+COLORKEY_CANDIDATES = ((255, 0, 255), (0, 255, 0), (0, 255, 255), (1, 2, 3))
+
+# Số thread giải mã ảnh song song (pygame nhả GIL khi giải mã PNG/JPG)
+PRELOAD_WORKERS = int(os.environ.get("CULVER_PRELOAD_WORKERS") or min(4, os.cpu_count() or 1))
+
+
+def surface_bytes(surf: pygame.Surface) -> int:
+    return surf.get_pitch() * surf.get_height()
+
+
+# ----------------- Chọn định dạng surface -----------------
+def alpha_kind(surf: pygame.Surface) -> str:
+    """"opaque" / "binary" / "blend" theo giá trị alpha thật của các pixel"""
+    if not surf.get_flags() & pygame.SRCALPHA:
+        return "opaque" if surf.get_colorkey() is None else "binary"
+    width, height = surf.get_size()
+    solid = pygame.mask.from_surface(surf, 254).count()
+    if solid == width * height:
+        return "opaque"
+    if solid == pygame.mask.from_surface(surf, 0).count():
+        return "binary"
+    return "blend"
+
+
+def convert_best(surf: pygame.Surface, kind=None) -> pygame.Surface:
+    """Convert theo nội dung alpha (kind tính sẵn thì khỏi phân tích lại)"""
+    kind = kind or alpha_kind(surf)
+    if kind == "opaque":
+        return surf.convert()
+    if kind == "binary" and surf.get_flags() & pygame.SRCALPHA:
+        visible = pygame.mask.from_surface(surf, 0)
+        for key in COLORKEY_CANDIDATES:
+            # màu key không được trùng pixel nào đang hiện
+            if not visible.overlap_area(pygame.mask.from_threshold(surf, key, (1, 1, 1, 255)), (0, 0)):
+                break
+        else:
+            return surf.convert_alpha()
+        source = surf.copy()
+        source.set_alpha(None)  # chép thẳng RGB, không blend
+        keyed = pygame.Surface(surf.get_size()).convert()
+        keyed.blit(source, (0, 0))
+        visible.invert()
+        visible.to_surface(keyed, setcolor=key, unsetcolor=None)
+        keyed.set_colorkey(key, pygame.RLEACCEL)
+        return keyed
+    if kind == "binary":
+        return surf.convert()  # đã có colorkey sẵn
+    return surf.convert_alpha()
+
+
+def rle_sprite(surf: pygame.Surface) -> pygame.Surface:
+    """Bản sao độc lập nén RLE của sprite có alpha, cho ảnh vẽ hàng trăm lần mỗi frame
+
+    Các đoạn trong suốt / đục hẳn được bỏ qua / chép thẳng nên blit nhanh
+    hơn nhiều lần; pixel mờ có thể lệch 1/255. Không có display surface
+    (backend sdl2 vẽ bằng texture) thì trả về nguyên ảnh.
+    """
+    if pygame.display.get_surface() is None:
+        return surf
+    copy = surf.convert_alpha()
+    copy.set_alpha(255, pygame.RLEACCEL)
+    return copy
+
+
+def solid_surface(size, color, alpha=False) -> pygame.Surface:
+    """Surface một màu (ảnh dự phòng khi thiếu file), đã convert nếu có video mode"""
+    surf = pygame.Surface(size, pygame.SRCALPHA if alpha else 0)
+    if pygame.display.get_surface() is not None:
+        surf = surf.convert_alpha() if alpha else surf.convert()
+    surf.fill(color)
+    return surf
+
+
+# ----------------- Asset manager -----------------
+class AssetManager:
+    """Giải mã mỗi file một lần và giữ surface đã convert trong cache LRU"""
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._cache = OrderedDict()
+        # cache được dùng chung với thread preload
+        self._lock = threading.RLock()
+
+    def set_budget(self, budget_mb):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        with self._lock:
+            self._evict()
+
+    def load(self, path: str, mode: str = "alpha", size=None):
+        """Trả về surface đã convert (và scale nếu có size), None nếu thiếu file"""
+        if mode not in MODES:
+            raise ValueError(f"Chế độ convert không hợp lệ: {mode}")
+        key = (os.path.abspath(path), mode, tuple(size) if size else None)
+        with self._lock:
+            surf = self._cache.get(key)
+            if surf is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return surf
+
+        # mỗi lần gọi load() chỉ tính một hit hoặc một miss, kể cả khi phải lấy bản gốc để scale
+        self.misses += 1
+        base = self._base(key[0], mode)
+        if not size or base is None:
+            return base
+        surf = pygame.transform.scale(base, key[2])
+        self._store(key, surf)
+        return surf
+
+    def preload(self, paths) -> "Preloader":
+        """Giải mã thô các file trên thread pool; load() sau đó chỉ còn convert"""
+        return Preloader(self, paths)
+
+    def decode_raw(self, path: str):
+        """Giải mã (chưa convert) và cache, an toàn khi gọi từ thread khác"""
+        key = (os.path.abspath(path), "raw", None)
+        with self._lock:
+            if key in self._cache:
+                return
+        if not os.path.exists(path):
+            return
+        surf = pygame.image.load(key[0])
+        with self._lock:
+            if key not in self._cache:
+                self._store(key, surf)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._cache),
+            "used_bytes": self.used_bytes,
+            "budget_bytes": self.budget_bytes,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.used_bytes = 0
+
+    # ---- nội bộ ----
+    def _base(self, abspath, mode):
+        """Bản chưa scale: lấy từ cache hoặc giải mã + convert, không đụng tới hits / misses"""
+        key = (abspath, mode, None)
+        with self._lock:
+            surf = self._cache.get(key)
+            if surf is not None:
+                self._cache.move_to_end(key)
+                return surf
+        if not os.path.exists(abspath):
+            return None
+        surf = self._convert(self._decode(abspath), mode)
+        if mode != "raw":
+            # bản thô preload chỉ để convert; giữ cả hai là tính ngân sách hai lần
+            self._discard((abspath, "raw", None))
+        self._store(key, surf)
+        return surf
+
+    def _decode(self, abspath):
+        # Nếu đã có bản giải mã thô trong cache thì dùng lại, không đọc đĩa nữa
+        with self._lock:
+            raw = self._cache.get((abspath, "raw", None))
+        if raw is not None:
+            return raw
+        return pygame.image.load(abspath)
+
+    @staticmethod
+    def _convert(surf, mode):
+        if mode == "raw" or pygame.display.get_surface() is None:
+            # backend sdl2 không có display surface: ảnh được upload thành texture,
+            # renderer tự đổi định dạng nên giữ nguyên bản giải mã
+            return surf
+        if mode == "opaque":
+            return surf.convert()
+        if mode == "alpha":
+            return surf.convert_alpha()
+        if mode == "best":
+            return convert_best(surf)
+        if surf.get_alpha() is not None:
+            return surf.convert_alpha()
+        return surf.convert()
+
+    def _discard(self, key):
+        with self._lock:
+            surf = self._cache.pop(key, None)
+            if surf is not None:
+                self.used_bytes -= surface_bytes(surf)
+
+    def _store(self, key, surf):
+        with self._lock:
+            self._cache[key] = surf
+            self.used_bytes += surface_bytes(surf)
+            self._evict()
+
+    def _evict(self):
+        # Giữ lại ít nhất mục vừa thêm dù nó vượt ngân sách
+        while self.used_bytes > self.budget_bytes and len(self._cache) > 1:
+            _, old = self._cache.popitem(last=False)
+            self.used_bytes -= surface_bytes(old)
+            self.evictions += 1
+
+
+# ----------------- Preload trên thread pool -----------------
+_executor = None
+
+
+def _preload_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PRELOAD_WORKERS, thread_name_prefix="asset-preload")
+    return _executor
+
+
+class Preloader:
+    """Giải mã trước một danh sách ảnh song song trên thread pool, có báo tiến độ"""
+
+    def __init__(self, manager, paths):
+        self.paths = list(dict.fromkeys(paths))
+        self.loaded = 0
+        self.errors = []  # (đường dẫn, lỗi) của các file giải mã hỏng
+        self._reported = False
+        self._manager = manager
+        self._lock = threading.Lock()
+        self._futures = [_preload_executor().submit(self._decode, path) for path in self.paths]
+
+    def _decode(self, path):
+        try:
+            self._manager.decode_raw(path)
+        except (pygame.error, OSError) as e:
+            # level sẽ load lại file này trên main thread (và dùng ảnh dự phòng)
+            with self._lock:
+                self.errors.append((path, e))
+        with self._lock:
+            self.loaded += 1
+
+    @property
+    def progress(self) -> float:
+        return self.loaded / len(self.paths) if self.paths else 1.0
+
+    def done(self) -> bool:
+        if not all(future.done() for future in self._futures):
+            return False
+        if self.errors and not self._reported:
+            # báo một lần trên main thread, lúc người gọi biết preload đã xong
+            self._reported = True
+            for path, e in self.errors:
+                print(f"Không thể giải mã trước ảnh {path}: {e}")
+        return True
+
+    def wait(self, timeout=None) -> bool:
+        wait_futures(self._futures, timeout)
+        return self.done()
+
+
+budget_env = os.environ.get("CULVER_ASSET_BUDGET_MB")
+assets = AssetManager(float(budget_env) if budget_env else DEFAULT_BUDGET_MB)
+
+
+# ----------------- Cache surface đã scale -----------------
+class ScaleCache:
+    """Cache LRU surface đã scale theo (nguồn, kích thước đích, bộ lọc)
+
+    Bị xoá hết khi kích thước cửa sổ thay đổi, nên các frame ổn định
+    không phải resample lại lần nào. Key giữ tham chiếu tới surface nguồn,
+    nên cache có giới hạn số mục để phiên chơi dài không phình mãi.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.window_size = None
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def get(self, surf: pygame.Surface, size, smooth: bool = False) -> pygame.Surface:
+        size = (max(1, int(size[0])), max(1, int(size[1])))
+        key = (surf, size, smooth)
+        scaled = self._cache.get(key)
+        if scaled is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return scaled
+
+        self.misses += 1
+        if surf.get_size() == size:
+            scaled = surf
+        # smoothscale trộn màu key vào viền nên ảnh colorkey chỉ scale thường
+        elif smooth and surf.get_bitsize() >= 24 and surf.get_colorkey() is None:
+            scaled = pygame.transform.smoothscale(surf, size)
+        else:
+            scaled = pygame.transform.scale(surf, size)
+        self._cache[key] = scaled
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return scaled
+
+    def invalidate(self, window_size=None):
+        self._cache.clear()
+        self.window_size = window_size
+
+    def surfaces(self) -> list:
+        """Các surface đã scale đang giữ (để báo cáo bộ nhớ)"""
+        return list(self._cache.values())
+
+    def ensure_window(self, window_size):
+        """Xoá cache nếu cửa sổ đã đổi kích thước từ lần gọi trước"""
+        if window_size != self.window_size:
+            self.invalidate(window_size)
+
+
+scale_cache = ScaleCache()
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import sys
+
+import pygame
+
+from assets import alpha_kind, assets, convert_best
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ATLAS_DIR = os.path.join(BASE_DIR, "baked")
+ATLAS_IMAGE = os.path.join(ATLAS_DIR, "atlas.png")
+ATLAS_INDEX = os.path.join(ATLAS_DIR, "atlas.json")
+
+# Các sprite được bake sẵn: (đường dẫn tương đối trong game/, kích thước level dùng)
+SPRITES = (
+    # level1: người chơi 120x160, đá 80x80, mũi tên 60x60, đá thật 180x180
+    [("player/stand0.png", (120, 160))]
+    + [(f"player/walkleft{i}.png", (120, 160)) for i in range(5)]
+    + [(f"background/stone{i}.png", (80, 80)) for i in range(1, 4)]
+    + [("background/arrow.png", (60, 60)), ("background/stonereal.png", (180, 180))]
+    # level2: người chơi 100x150, trâu 160x120
+    + [(f"player/stand{i}.png", (100, 150)) for i in range(2)]
+    + [(f"player/walkleft{i}.png", (100, 150)) for i in range(5)]
+    + [(f"buffalo/tile{i}.png", (160, 120)) for i in range(6)]
+)
+PADDING = 1
+MAX_WIDTH = 1024
+
+
+def sprite_key(path, size) -> str:
+    rel = os.path.relpath(os.path.abspath(path), BASE_DIR).replace(os.sep, "/")
+    return f"{rel}@{size[0]}x{size[1]}"
+
+
+# ----------------- Đọc atlas lúc chạy -----------------
+class Atlas:
+    """Một ảnh atlas + file index; sprite là subsurface cắt ra từ ảnh đó
+
+    Sprite không có trong atlas (hoặc chưa bake) thì load file lẻ qua
+    `assets` như cũ, nên thiếu thư mục baked/ game vẫn chạy được.
+    """
+
+    def __init__(self, index_path=ATLAS_INDEX):
+        self.index_path = index_path
+        self.image_path = None
+        self._frames = None
+        self._alpha = {}
+        self._sheet = None
+        self._sprites = {}
+
+    @property
+    def frames(self) -> dict:
+        if self._frames is None:
+            try:
+                with open(self.index_path, encoding="utf-8") as f:
+                    index = json.load(f)
+                self.image_path = os.path.join(os.path.dirname(self.index_path), index["image"])
+                self._frames = {key: tuple(entry["rect"]) for key, entry in index["frames"].items()}
+                self._alpha = {key: entry.get("alpha", "blend") for key, entry in index["frames"].items()}
+            except (OSError, ValueError, KeyError):
+                self._frames = {}
+                self._alpha = {}
+        return self._frames
+
+    def load(self, path: str, size):
+        """Sprite đã scale sẵn theo size, None nếu thiếu cả atlas lẫn file gốc"""
+        key = sprite_key(path, size)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            return sprite
+        rect = self.frames.get(key)
+        if rect is None or self.sheet() is None:
+            return assets.load(path, "alpha", size)
+        sprite = self._sheet.subsurface(rect)
+        kind = self._alpha.get(key, "blend")
+        if kind != "blend" and pygame.display.get_surface() is not None:
+            # sprite đục / alpha 0-255 tách khỏi atlas thành convert() hoặc colorkey + RLE;
+            # backend sdl2 (không có display surface) giữ subsurface để dùng chung texture
+            sprite = convert_best(sprite, kind)
+        self._sprites[key] = sprite
+        return sprite
+
+    def sheet(self):
+        if self._sheet is None and self.frames:
+            # giải mã + convert đúng một lần, các sprite dùng chung pixel
+            self._sheet = assets.load(self.image_path, "alpha")
+        return self._sheet
+
+    def preload_paths(self, paths) -> list:
+        """Thay các file đã có trong atlas bằng chính ảnh atlas (để preload)"""
+        baked = {key.rsplit("@", 1)[0] for key in self.frames}
+        rest = [p for p in paths
+                if os.path.relpath(os.path.abspath(p), BASE_DIR).replace(os.sep, "/") not in baked]
+        if len(rest) == len(paths):
+            return list(paths)
+        return [self.image_path] + rest
+
+    def clear(self):
+        self._frames = None
+        self._alpha = {}
+        self._sheet = None
+        self._sprites.clear()
+
+
+atlas = Atlas()
+
+
+# ----------------- Bake -----------------
+def pack(sizes, max_width=MAX_WIDTH, padding=PADDING):
+    """Xếp theo kệ (shelf), ảnh cao trước; trả về vị trí từng ảnh và kích thước atlas"""
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    positions = [None] * len(sizes)
+    x = y = shelf_h = width = 0
+    for i in order:
+        w, h = sizes[i]
+        if x and x + w > max_width:
+            x, y = 0, y + shelf_h + padding
+            shelf_h = 0
+        positions[i] = (x, y)
+        x += w + padding
+        shelf_h = max(shelf_h, h)
+        width = max(width, x - padding)
+    return positions, (width, y + shelf_h)
+
+
+def bake(sprites=SPRITES, out_dir=ATLAS_DIR):
+    """Scale sẵn các sprite, ghép vào một ảnh và ghi index JSON cạnh nó"""
+    frames = []
+    for rel, size in sprites:
+        path = os.path.join(BASE_DIR, rel)
+        if not os.path.exists(path):
+            print(f"Bỏ qua (thiếu file): {rel}")
+            continue
+        # scale giống hệt assets.load(path, "alpha", size) để không lệch pixel
+        frames.append((rel, size, pygame.transform.scale(pygame.image.load(path).convert_alpha(), size)))
+
+    positions, atlas_size = pack([size for _, size, _ in frames])
+    sheet = pygame.Surface(atlas_size, pygame.SRCALPHA)
+    index = {"image": os.path.basename(ATLAS_IMAGE), "size": list(atlas_size), "frames": {}}
+    for (rel, size, surf), pos in zip(frames, positions):
+        sheet.blit(surf, pos)
+        index["frames"][sprite_key(os.path.join(BASE_DIR, rel), size)] = {
+            "rect": [pos[0], pos[1], size[0], size[1]],
+            "source_bytes": os.path.getsize(os.path.join(BASE_DIR, rel)),
+            "alpha": alpha_kind(surf),
+        }
+
+    os.makedirs(out_dir, exist_ok=True)
+    pygame.image.save(sheet, os.path.join(out_dir, os.path.basename(ATLAS_IMAGE)))
+    with open(os.path.join(out_dir, os.path.basename(ATLAS_INDEX)), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    return index
+
+
+def stale(index_path=ATLAS_INDEX, sprites=SPRITES) -> list:
+    """Các sprite thiếu trong atlas hoặc có file gốc đã đổi từ lần bake trước"""
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            frames = json.load(f)["frames"]
+    except (OSError, ValueError, KeyError):
+        frames = {}
+    result = []
+    for rel, size in sprites:
+        path = os.path.join(BASE_DIR, rel)
+        entry = frames.get(sprite_key(path, size))
+        if os.path.exists(path) and (entry is None or entry.get("source_bytes") != os.path.getsize(path)):
+            result.append(rel)
+    return result
+
+
+def missing(sprites=SPRITES) -> list:
+    """Các sprite trong SPRITES không có file gốc (bake sẽ bỏ qua chúng)"""
+    return [rel for rel, _ in sprites if not os.path.exists(os.path.join(BASE_DIR, rel))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bake sprite vào một ảnh atlas + index")
+    parser.add_argument("--check", action="store_true",
+                        help="chỉ kiểm tra atlas đã cũ chưa hoặc SPRITES trỏ tới file không có (exit 1 nếu có)")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        absent = missing()
+        for rel in absent:
+            print(f"Thiếu file gốc: {rel}")
+        outdated = stale()
+        for rel in outdated:
+            print(f"Cần bake lại: {rel}")
+        return 1 if outdated or absent else 0
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    # convert_alpha() cần có video mode
+    pygame.display.set_mode((1, 1))
+    index = bake()
+    w, h = index["size"]
+    print(f"Đã bake {len(index['frames'])} sprite vào {ATLAS_IMAGE} ({w}x{h})")
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
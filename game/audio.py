@@ -0,0 +1,189 @@
+import os
+
+import numpy as np
+import pygame
+
+# ----------------- Cấu hình -----------------
+# CULVER_AUDIO=0 tắt hẳn âm thanh. Buffer nhỏ (số mẫu, CULVER_AUDIO_BUFFER) cho độ trễ
+# thấp: 256 mẫu ở 44.1 kHz ≈ 6 ms; máy yếu nghe rè thì tăng lên 512 / 1024
+AUDIO_ENABLED = os.environ.get("CULVER_AUDIO", "1") == "1"
+FREQUENCY = 44100
+BUFFER = int(os.environ.get("CULVER_AUDIO_BUFFER", "256"))
+# số kênh SFX cố định; hết kênh thì cướp tiếng có ưu tiên thấp nhất
+VOICES = int(os.environ.get("CULVER_AUDIO_VOICES", "8"))
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+SOUND_DIR = os.path.join(base_dir, "sound")
+MUSIC_DIR = os.path.join(base_dir, "music")
+
+# tên: (file, ưu tiên, tiếng thay thế khi thiếu file: (Hz đầu, Hz cuối, ms))
+SFX = {
+    "jump": ("jump.wav", 1, (300, 700, 120)),
+    "pick": ("pick.wav", 2, (1200, 1600, 80)),
+    "charge": ("charge.wav", 2, (90, 60, 450)),
+    "hit": ("hit.wav", 3, (420, 150, 250)),
+}
+# nhạc nền theo chapter, phát trực tiếp từ đĩa (không giải mã hết vào RAM)
+MUSIC = {
+    "chapter1": "chapter1.ogg",
+    "chapter2": "chapter2.ogg",
+}
+
+_SAMPLE_TYPES = {8: np.uint8, -8: np.int8, 16: np.uint16, -16: np.int16, 32: np.float32}
+
+
+def tone(freq_start, freq_end, ms, frequency=FREQUENCY, size=-16, channels=2) -> pygame.mixer.Sound:
+    """Tiếng quét tần số tắt dần, dùng thay khi chưa có file SFX"""
+    n = max(1, int(frequency * ms / 1000))
+    t = np.arange(n) / frequency
+    freq = np.linspace(freq_start, freq_end, n)
+    wave = np.sin(2 * np.pi * np.cumsum(freq) / frequency) * np.exp(-4.0 * t / t[-1]) * 0.4
+    dtype = _SAMPLE_TYPES.get(size, np.int16)
+    if dtype is np.float32:
+        samples = wave.astype(np.float32)
+    else:
+        info = np.iinfo(dtype)
+        # số không dấu thì lấy giữa khoảng làm mức 0
+        mid = (int(info.max) + int(info.min) + 1) // 2
+        samples = (mid + wave * (info.max - mid)).astype(dtype)
+    if channels > 1:
+        samples = np.repeat(samples[:, None], channels, axis=1)
+    return pygame.sndarray.make_sound(np.ascontiguousarray(samples))
+
+
+# ----------------- Âm thanh -----------------
+class Audio:
+    """Mixer độ trễ thấp + bank SFX giải mã sẵn + nhạc nền phát từ đĩa
+
+    SFX chạy trên `VOICES` kênh cố định. Hết kênh trống thì cướp tiếng
+    có ưu tiên thấp nhất (cùng ưu tiên thì tiếng cũ nhất), nhưng không
+    bao giờ cướp tiếng ưu tiên cao hơn: khi đó tiếng mới bị bỏ. Chưa
+    init() (headless, replay, bench) thì mọi lệnh phát đều không làm gì.
+    """
+
+    def __init__(self, voices=VOICES):
+        self.voices = voices
+        self.ready = False
+        self.bank = {}
+        self.channels = []
+        self.playing = []  # (ưu tiên, số thứ tự lúc phát) của từng kênh
+        self.music = None
+        self.stolen = 0
+        self.dropped = 0
+        self._serial = 0
+        self._reported = set()  # file nhạc thiếu đã báo (chỉ báo một lần)
+
+    def init(self, buffer=BUFFER) -> bool:
+        if self.ready:
+            return True
+        if not AUDIO_ENABLED:
+            return False
+        try:
+            # pygame.init() có thể đã mở mixer với buffer mặc định → mở lại với buffer nhỏ
+            if pygame.mixer.get_init():
+                pygame.mixer.quit()
+            pygame.mixer.init(FREQUENCY, -16, 2, buffer)
+        except pygame.error:
+            # không có thiết bị âm thanh: chơi tiếp không tiếng
+            return False
+        pygame.mixer.set_num_channels(self.voices)
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.voices)]
+        self.playing = [(0, 0)] * self.voices
+        self.load_bank()
+        self.ready = True
+        return True
+
+    def load_bank(self):
+        """Giải mã mọi SFX một lần; thiếu file thì dựng tiếng thay thế"""
+        frequency, size, channels = pygame.mixer.get_init()
+        missing = []
+        for name, (filename, _, fallback) in SFX.items():
+            path = os.path.join(SOUND_DIR, filename)
+            sound = None
+            if os.path.exists(path):
+                try:
+                    sound = pygame.mixer.Sound(path)
+                except pygame.error as e:
+                    print(f"Không thể tải âm thanh {path}: {e}")
+            else:
+                missing.append(filename)
+            if sound is None:
+                sound = tone(*fallback, frequency=frequency, size=size, channels=channels)
+            self.bank[name] = sound
+        if missing:
+            print(f"Thiếu {', '.join(missing)} trong {SOUND_DIR}: dùng tiếng thay thế")
+
+    # ---- SFX ----
+    def play(self, name, volume=1.0):
+        """Phát SFX trên một kênh của pool, trả về kênh (None nếu bị bỏ)"""
+        if not self.ready:
+            return None
+        priority = SFX[name][1]
+        index = self._voice_for(priority)
+        if index is None:
+            self.dropped += 1
+            return None
+        channel = self.channels[index]
+        if channel.get_busy():
+            self.stolen += 1
+        channel.set_volume(volume)
+        channel.play(self.bank[name])
+        self._serial += 1
+        self.playing[index] = (priority, self._serial)
+        return channel
+
+    def _voice_for(self, priority):
+        victim = None
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return i
+            # chỉ cướp tiếng ưu tiên không cao hơn; chọn thấp nhất rồi cũ nhất
+            if self.playing[i][0] <= priority and (victim is None or self.playing[i] < self.playing[victim]):
+                victim = i
+        return victim
+
+    # ---- nhạc nền ----
+    def play_music(self, tag, fade_ms=0):
+        """Phát lặp nhạc nền của chapter; đang phát đúng bài đó thì để nguyên"""
+        if not self.ready or tag == self.music:
+            return
+        filename = MUSIC.get(tag)
+        path = os.path.join(MUSIC_DIR, filename) if filename else None
+        if path is None or not os.path.exists(path):
+            if path is not None and path not in self._reported:
+                self._reported.add(path)
+                print(f"Không có nhạc nền {path}: tắt nhạc")
+            self.stop_music(fade_ms)
+            return
+        try:
+            pygame.mixer.music.load(path)
+            pygame.mixer.music.play(-1, fade_ms=fade_ms)
+        except pygame.error as e:
+            print(f"Không thể phát nhạc {path}: {e}")
+            return
+        self.music = tag
+
+    def stop_music(self, fade_ms=0):
+        if not self.ready or self.music is None:
+            return
+        if fade_ms:
+            pygame.mixer.music.fadeout(int(fade_ms))
+        else:
+            pygame.mixer.music.stop()
+        self.music = None
+
+    def stats(self) -> dict:
+        busy = sum(channel.get_busy() for channel in self.channels)
+        return {"voices": self.voices, "busy": busy, "stolen": self.stolen, "dropped": self.dropped,
+                "music": self.music, "bank": sorted(self.bank)}
+
+    def quit(self):
+        if self.ready:
+            pygame.mixer.quit()
+        self.ready = False
+        self.bank.clear()
+        self.channels = []
+        self.music = None
+
+
+audio = Audio()
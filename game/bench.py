@@ -0,0 +1,275 @@
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import render
+from transitions import Hold
+
+try:
+    import resource
+except ImportError:  # Windows không có module resource
+    resource = None
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "1440p": (2560, 1440)}
+
+# Giá trị state đại diện cho mỗi màn hình menu (giữ cố định suốt lượt đo)
+MENU_SCENES = {
+    "menu": {"transition": None},
+    "fade_out_menu": {"transition": Hold(128, 1000)},
+    "message": {"message_alpha": 200, "message_start_time": 0.0, "sim_time": 0.0, "transition": None},
+    "chapter_select": {"chapter_alpha": 255, "transition": None},
+    "fade_out_chapter": {"chapter_alpha": 255, "transition": Hold(128, 1000)},
+}
+LEVEL_SCENES = ("level1", "level2")
+# level2 với cả đàn trâu (số con)
+HERD_SCENES = {"herd100": 100, "herd500": 500}
+# level1 với một emitter luôn giữ đủ số hạt (bụi tung khắp màn hình)
+PARTICLE_SCENES = {"particles3000": 3000}
+SCENES = tuple(MENU_SCENES) + LEVEL_SCENES + tuple(HERD_SCENES) + tuple(PARTICLE_SCENES)
+
+
+def peak_rss_kb():
+    """Đỉnh RSS của cả tiến trình tới giờ (chỉ tăng, không tách được theo scene)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS trả về byte, Linux trả về KB
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def current_rss_kb():
+    """RSS hiện tại (Linux: /proc/self/statm), None nếu hệ điều hành không có"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ----------------- Dựng frame cho từng scene -----------------
+def make_frame(scene, size, backend="surface"):
+    """Trả về hàm vẽ + present đúng một frame của scene ở độ phân giải size"""
+    if scene in MENU_SCENES:
+        import game
+        game.init(size, backend)
+        values = dict(MENU_SCENES[scene], state=scene)
+
+        def frame():
+            for name, value in values.items():
+                setattr(game, name, value)
+            game.draw_state()
+            render.present(game.screen)
+        return frame
+
+    screen = render.open_window(size, backend=backend) if backend == "sdl2" else pygame.display.set_mode(size)
+
+    from controls import ScriptedControls
+    from headless import DEFAULT_SCRIPTS, LEVELS
+    if scene in HERD_SCENES:
+        level = LEVELS["level2"](screen, rng=random.Random(0), herd_size=HERD_SCENES[scene],
+                                 controls_source=ScriptedControls(DEFAULT_SCRIPTS["level2"], loop=True))
+    elif scene in PARTICLE_SCENES:
+        import particles
+        level = LEVELS["level1"](screen, rng=random.Random(0),
+                                 controls_source=ScriptedControls(DEFAULT_SCRIPTS["level1"], loop=True))
+        emitter = particles.dust(PARTICLE_SCENES[scene])
+        level.emitters.append(emitter)
+        width, height = size
+
+        def frame():
+            emitter.emit(emitter.capacity - emitter.live, level.camera.x + width / 2, height / 2,
+                         speed=(0.5, 6.0), life=(500.0, 1500.0), spread=height / 3)
+            level.update()
+            level.draw(1.0)
+        frame.queue = level.queue
+        frame.renderer = level.renderer
+        return frame
+    else:
+        level = LEVELS[scene](screen, rng=random.Random(0),
+                              controls_source=ScriptedControls(DEFAULT_SCRIPTS[scene], loop=True))
+
+    def frame():
+        level.update()
+        level.draw(1.0)
+    # để đọc số lệnh vẽ và tỉ lệ vùng vẽ lại mỗi frame
+    frame.queue = level.queue
+    frame.renderer = level.renderer
+    return frame
+
+
+def measure(scene, size, frames, warmup, backend="surface", gc_freeze=False):
+    rss_before = current_rss_kb()
+    if gc_freeze:
+        # như game.main(): đóng băng những gì có trước khi dựng scene
+        gc.collect()
+        gc.freeze()
+    try:
+        return _measure(scene, size, frames, warmup, backend, rss_before)
+    finally:
+        if gc_freeze:
+            gc.unfreeze()
+
+
+def _measure(scene, size, frames, warmup, backend, rss_before):
+    frame = make_frame(scene, size, backend)
+    for _ in range(warmup):
+        frame()
+
+    renderer = getattr(frame, "renderer", None)
+    times = []
+    fractions = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        frame()
+        times.append((time.perf_counter() - start) * 1000.0)
+        if renderer is not None:
+            fractions.append(renderer.last_fraction)
+
+    # Lượt riêng để đo cấp phát, tracemalloc làm chậm nên không lẫn vào thời gian
+    alloc_frames = min(frames, 60)
+    tracemalloc.start()
+    blocks = []
+    peaks = []
+    for _ in range(alloc_frames):
+        before_blocks = sys.getallocatedblocks()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        frame()
+        _, peak = tracemalloc.get_traced_memory()
+        # số block tăng thêm (cấp rồi giải phóng trong frame thì không tính)
+        blocks.append(sys.getallocatedblocks() - before_blocks)
+        peaks.append(peak - before)
+    tracemalloc.stop()
+    rss_after = current_rss_kb()
+
+    queue = getattr(frame, "queue", None)
+    return {
+        "frames": frames,
+        "mean_ms": statistics.fmean(times),
+        "p95_ms": percentile(times, 95),
+        "p99_ms": percentile(times, 99),
+        "net_blocks_per_frame": statistics.fmean(blocks),
+        "alloc_peak_kb_per_frame": statistics.fmean(peaks) / 1024,
+        # RSS của riêng scene này: hiện tại sau khi đo trừ lúc trước khi dựng scene
+        "rss_kb": rss_after,
+        "rss_delta_kb": rss_after - rss_before if rss_before is not None else None,
+        "process_peak_rss_kb": peak_rss_kb(),
+        "draw_calls": queue.draw_calls if queue is not None else None,
+        # phần màn hình phải cập nhật mỗi frame (1.0 khi tắt dirty-rect / menu)
+        "redraw_fraction": statistics.fmean(fractions) if fractions else None,
+    }
+
+
+def run(scenes, resolutions, frames, warmup, backend="surface", dirty=False, gc_freeze=False):
+    pygame.init()
+    results = {}
+    # level tạo renderer sau lúc này nên đổi mặc định là đủ
+    render.DIRTY_RECTS_DEFAULT = dirty
+    # backend surface giữ tên cũ để so được với baseline trước đây
+    suffix = ("" if backend == "surface" else f"/{backend}") + ("/dirty" if dirty else "")
+    for res_name in resolutions:
+        for scene in scenes:
+            key = f"{scene}@{res_name}{suffix}"
+            results[key] = measure(scene, RESOLUTIONS[res_name], frames, warmup, backend, gc_freeze)
+            r = results[key]
+            print(f"{key:28s} mean {r['mean_ms']:7.3f}ms  p95 {r['p95_ms']:7.3f}ms  "
+                  f"p99 {r['p99_ms']:7.3f}ms  net {r['net_blocks_per_frame']:6.1f} blk  "
+                  f"peak {r['alloc_peak_kb_per_frame']:6.1f} KB  rss Δ{r['rss_delta_kb']} KB" +
+                  (f"  calls {r['draw_calls']}" if r["draw_calls"] is not None else "") +
+                  (f"  redraw {r['redraw_fraction']:5.1%}" if r["redraw_fraction"] is not None else ""))
+    return results
+
+
+def measure_startup(runs):
+    """Chạy game.py ở tiến trình mới, đo từ lúc gọi tới frame menu đầu tiên"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "game.py")
+    times = []
+    for _ in range(runs):
+        env = dict(os.environ, CULVER_STARTUP="1", CULVER_STARTUP_T0=repr(time.time()))
+        out = subprocess.run([sys.executable, script], env=env, capture_output=True, text=True, check=True).stdout
+        times.append(float(out.rsplit("time-to-first-frame:", 1)[1].split()[0]))
+    result = {"runs": runs, "mean_ms": statistics.fmean(times),
+              "p95_ms": percentile(times, 95), "min_ms": min(times)}
+    print(f"{'startup':28s} mean {result['mean_ms']:7.1f}ms  p95 {result['p95_ms']:7.1f}ms  "
+          f"min {result['min_ms']:7.1f}ms  (time-to-first-frame)")
+    return result
+
+
+def compare(results, baseline, threshold, metrics=("mean_ms", "p95_ms")):
+    """Trả về danh sách scene bị chậm hơn baseline quá ngưỡng"""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric in metrics:
+            if base[metric] > 0 and current[metric] > base[metric] * (1 + threshold):
+                regressions.append((key, metric, base[metric], current[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark thời gian frame cho từng scene")
+    parser.add_argument("--scenes", nargs="+", choices=SCENES, default=list(SCENES))
+    parser.add_argument("--resolutions", nargs="+", choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--backend", choices=render.BACKENDS, default=render.BACKEND)
+    parser.add_argument("--dirty", action="store_true", default=render.DIRTY_RECTS_DEFAULT,
+                        help="bật dirty-rect cho các level (mặc định theo CULVER_DIRTY_RECTS)")
+    parser.add_argument("--gc-freeze", action=argparse.BooleanOptionalAction,
+                        default=os.environ.get("CULVER_GC_FREEZE", "1") == "1",
+                        help="gc.freeze() trước khi dựng scene như game.main() (mặc định theo CULVER_GC_FREEZE)")
+    parser.add_argument("--startup", type=int, default=0, metavar="N",
+                        help="đo thêm time-to-first-frame qua N lần khởi động game.py")
+    parser.add_argument("--out", help="ghi kết quả ra file JSON (baseline)")
+    parser.add_argument("--compare", help="so sánh với file baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="tỉ lệ chậm hơn cho phép trước khi báo lỗi (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args.scenes, args.resolutions, args.frames, args.warmup, args.backend, args.dirty,
+                  args.gc_freeze)
+    if args.startup:
+        results["startup"] = measure_startup(args.startup)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": {"pygame": pygame.version.ver, "python": sys.version.split()[0],
+                                "frames": args.frames, "backend": args.backend, "dirty": args.dirty,
+                                "gc_freeze": args.gc_freeze},
+                       "scenes": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["scenes"]
+        regressions = compare(results, baseline, args.threshold)
+        for key, metric, before, after in regressions:
+            print(f"CHẬM HƠN: {key} {metric} {before:.3f}ms -> {after:.3f}ms")
+        if regressions:
+            return 1
+        print("Không có scene nào chậm hơn baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+from collections import defaultdict
+
+import numpy as np
+import pygame
+
+# ----------------- Lớp va chạm (bitmask) -----------------
+PICKUP = 1
+HAZARD = 2
+TRIGGER = 4
+ALL_LAYERS = PICKUP | HAZARD | TRIGGER
+
+CELL_SIZE = 128
+
+
+class Body:
+    __slots__ = ("key", "layers", "rect", "mask", "owner", "index", "span")
+
+    def __init__(self, key, layers, rect=None, mask=None, owner=None, index=None):
+        self.key = key
+        self.layers = layers
+        self.rect = rect
+        self.mask = mask
+        # body thuộc một nhóm mảng (vd. Herd): rect/mask lấy từ owner lúc kiểm tra,
+        # mask là mask dựng sẵn theo frame (FrameSet) nên không phải tạo lại
+        self.owner = owner
+        self.index = index
+        self.span = None
+
+    def current(self):
+        if self.owner is not None:
+            return self.owner.get_rect_mask(self.index)
+        return self.rect, self.mask
+
+
+# ----------------- Thế giới va chạm -----------------
+class CollisionWorld:
+    """Broadphase lưới đều (spatial hash) + lọc rect + so mask khi cần
+
+    Mỗi ô lưới giữ tập key của các body chạm ô đó, nên một truy vấn chỉ
+    xét các body ở gần chứ không duyệt hết. Body chỉ bị băm lại khi
+    dải ô nó chiếm thay đổi.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.bodies = {}
+        self.cells = defaultdict(set)
+        self._group_spans = {}
+        # số body đã qua broadphase ở truy vấn gần nhất (để đo)
+        self.last_candidates = 0
+
+    def _span(self, rect):
+        cs = self.cell_size
+        return (rect.left // cs, rect.top // cs, (rect.right - 1) // cs, (rect.bottom - 1) // cs)
+
+    def _hash(self, body, span):
+        if body.span == span:
+            return
+        if body.span is not None:
+            self._unhash(body)
+        x0, y0, x1, y1 = span
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self.cells[(cx, cy)].add(body.key)
+        body.span = span
+
+    def _unhash(self, body):
+        x0, y0, x1, y1 = body.span
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells[(cx, cy)]
+                cell.discard(body.key)
+                if not cell:
+                    del self.cells[(cx, cy)]
+        body.span = None
+
+    def add(self, key, rect, layers, mask=None) -> Body:
+        if key in self.bodies:
+            self.remove(key)
+        body = self.bodies[key] = Body(key, layers, pygame.Rect(rect), mask)
+        self._hash(body, self._span(body.rect))
+        return body
+
+    def remove(self, key):
+        body = self.bodies.pop(key, None)
+        if body is not None and body.span is not None:
+            self._unhash(body)
+
+    def clear(self):
+        self.bodies.clear()
+        self.cells.clear()
+        self._group_spans.clear()
+
+    def sync_group(self, group, owner, left, top, width, height, layers):
+        """Cập nhật cả một nhóm body lưu trong mảng (key = (group, i))
+
+        Dải ô được tính bằng mảng; chỉ những body vừa đổi ô mới bị băm lại
+        trong Python. Rect thật lấy từ owner.get_rect_mask(i) khi truy vấn.
+        """
+        cs = self.cell_size
+        left = np.floor(np.asarray(left, dtype=np.float64)) - 1  # nới 1px cho sai số làm tròn
+        top = np.broadcast_to(np.floor(np.asarray(top, dtype=np.float64)) - 1, left.shape)
+        spans = np.stack([left // cs, top // cs,
+                          (left + width + 1) // cs, (top + height + 1) // cs], axis=1).astype(np.int64)
+        prev = self._group_spans.get(group)
+        if prev is None or prev.shape != spans.shape:
+            for key in [k for k in self.bodies if isinstance(k, tuple) and k[0] == group]:
+                self.remove(key)
+            changed = range(len(spans))
+        else:
+            changed = np.flatnonzero((spans != prev).any(axis=1)).tolist()
+        for i in changed:
+            key = (group, i)
+            body = self.bodies.get(key)
+            if body is None:
+                body = self.bodies[key] = Body(key, layers, owner=owner, index=i)
+            self._hash(body, tuple(spans[i].tolist()))
+        self._group_spans[group] = spans
+
+    def query(self, rect, layers=ALL_LAYERS) -> list:
+        """Key các body thuộc layers có rect chạm rect"""
+        hits = []
+        for key in self._nearby(rect):
+            body = self.bodies[key]
+            if body.layers & layers:
+                body_rect, _ = body.current()
+                if body_rect.colliderect(rect):
+                    hits.append(key)
+        return hits
+
+    def overlap(self, rect, mask, layers=ALL_LAYERS) -> list:
+        """Như query() nhưng so thêm mask pixel-perfect (body không có mask = cả rect)"""
+        hits = []
+        for key in self._nearby(rect):
+            body = self.bodies[key]
+            if not body.layers & layers:
+                continue
+            body_rect, body_mask = body.current()
+            if not body_rect.colliderect(rect):
+                continue
+            if mask is None or body_mask is None:
+                hits.append(key)
+            elif mask.overlap(body_mask, (body_rect.x - rect.x, body_rect.y - rect.y)):
+                hits.append(key)
+        return hits
+
+    def _nearby(self, rect):
+        x0, y0, x1, y1 = self._span(rect)
+        if x0 == x1 and y0 == y1:
+            nearby = self.cells.get((x0, y0), ())
+        else:
+            nearby = set()
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    nearby.update(self.cells.get((cx, cy), ()))
+        self.last_candidates = len(nearby)
+        return nearby
@@ -0,0 +1,5 @@
+import os
+
+# test chạy không cần màn hình / loa
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
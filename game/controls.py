@@ -0,0 +1,98 @@
+import pygame
+
+# ----------------- Hành động (bitmask) -----------------
+LEFT = 1
+RIGHT = 2
+JUMP = 4
+PICK = 8
+
+ACTION_NAMES = {"left": LEFT, "right": RIGHT, "jump": JUMP, "pick": PICK}
+
+DEFAULT_KEYMAP = {
+    LEFT: (pygame.K_LEFT, pygame.K_a),
+    RIGHT: (pygame.K_RIGHT, pygame.K_d),
+    JUMP: (pygame.K_UP, pygame.K_SPACE, pygame.K_w),
+    PICK: (pygame.K_f,),
+}
+
+
+def parse_actions(text: str) -> int:
+    """"left+jump" -> LEFT | JUMP"""
+    mask = 0
+    for name in text.split("+"):
+        name = name.strip().lower()
+        if name:
+            mask |= ACTION_NAMES[name]
+    return mask
+
+
+# ----------------- Nguồn input -----------------
+class KeyboardControls:
+    """Đọc bàn phím thật, mỗi bước mô phỏng trả về một bitmask hành động"""
+
+    def __init__(self, keymap=None):
+        self.keymap = keymap or DEFAULT_KEYMAP
+
+    def poll(self, tick) -> int:
+        keys = pygame.key.get_pressed()
+        mask = 0
+        for action, codes in self.keymap.items():
+            if any(keys[code] for code in codes):
+                mask |= action
+        return mask
+
+
+class ScriptedControls:
+    """Input theo kịch bản cho chạy headless
+
+    `script` là danh sách (số tick, bitmask hoặc chuỗi "left+jump"),
+    phát lần lượt; hết kịch bản thì lặp lại nếu `loop` bật, không thì
+    trả về 0. Cũng nhận một hàm tick -> bitmask.
+    """
+
+    def __init__(self, script, loop=False):
+        self.loop = loop
+        if callable(script):
+            self._func = script
+            self._timeline = None
+        else:
+            self._func = None
+            self._timeline = []
+            for length, actions in script:
+                if isinstance(actions, str):
+                    actions = parse_actions(actions)
+                self._timeline.extend([actions] * length)
+
+    def poll(self, tick) -> int:
+        if self._func is not None:
+            return self._func(tick)
+        if not self._timeline:
+            return 0
+        if tick >= len(self._timeline):
+            if not self.loop:
+                return 0
+            tick %= len(self._timeline)
+        return self._timeline[tick]
+
+
+class RecordingControls:
+    """Bọc một nguồn input, ghi lại bitmask của từng tick (một byte / tick)"""
+
+    def __init__(self, source, actions=None):
+        self.source = source
+        self.actions = bytearray() if actions is None else actions
+
+    def poll(self, tick) -> int:
+        mask = self.source.poll(tick)
+        self.actions.append(mask)
+        return mask
+
+
+class ReplayControls:
+    """Phát lại bitmask đã ghi theo đúng tick, hết bản ghi thì trả về 0"""
+
+    def __init__(self, actions):
+        self.actions = actions
+
+    def poll(self, tick) -> int:
+        return self.actions[tick] if tick < len(self.actions) else 0
@@ -1,31 +1,62 @@
+import gc
+import time
+import importlib
+import random
 import pygame
 import sys
 import os
-from level1 import Level1
-from level2 import Level2
-pygame.init()
+from assets import assets, scale_cache, solid_surface
+from audio import audio
+from render import LOGICAL_SIZE, blit_scaled, mouse_pos, open_window, present, toggle_fullscreen
+from text import text_renderer
+from timestep import STEP_MS
+from profiler import profiler
+from replay import Recorder
+from scenes import Scene, ScenePool, SceneStack
+from transitions import Crossfade, Fade
 
 # ----------------- Cấu hình -----------------
-WIDTH, HEIGHT = 1280, 720
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("RPG Pixel Demo")
+# Mốc đo time-to-first-frame: lúc tiến trình được gọi (nếu có) hoặc lúc import module
+STARTUP_T0 = float(os.environ.get("CULVER_STARTUP_T0") or time.time())
+# CULVER_STARTUP=1: in thời gian tới frame đầu tiên rồi thoát (dùng cho bench)
+STARTUP_REPORT = os.environ.get("CULVER_STARTUP", "0") == "1"
+# Đóng băng object có từ lúc khởi động (CULVER_GC_FREEZE=0 để tắt), xem main()
+GC_FREEZE = os.environ.get("CULVER_GC_FREEZE", "1") == "1"
+first_frame_ms = None
 
-clock = pygame.time.Clock()
+WIDTH, HEIGHT = LOGICAL_SIZE
+screen = None  # tạo trong init(), luôn ở độ phân giải logic
 
-# ---- Font ----
+sim_time = 0.0  # ms, tăng theo từng bước mô phỏng cố định
+
+# ---- Font (mở lần đầu cần dùng) ----
 base_dir = os.path.dirname(os.path.abspath(__file__))
 font_path = os.path.join(base_dir, "font", "PressStart2P-Regular.ttf")
-font_game = pygame.font.Font(font_path, 20)
-font_title = pygame.font.Font(font_path, 32)
-font_vn = pygame.font.SysFont("tahoma", 28)  # font hỗ trợ tiếng Việt
+FONTS = {
+    "game": (font_path, 20),
+    "title": (font_path, 32),
+    "vn": ("tahoma", 28),  # font hệ thống hỗ trợ tiếng Việt, dò SysFont khá chậm
+}
+_fonts = {}
+
+def get_font(name) -> pygame.font.Font:
+    font = _fonts.get(name)
+    if font is None:
+        source, size = FONTS[name]
+        if os.path.exists(source):
+            font = pygame.font.Font(source, size)
+        else:
+            font = pygame.font.SysFont(source, size)
+        _fonts[name] = font
+    return font
 
 chapters = ["Chapter 1: Màn 1", "Chapter 2: Màn 2"]
 
 # ----------------- State -----------------
 state = "menu"
-fade_alpha = 0
-fade_speed = int(255 / (0.4 * 60))
+fade_duration = 400  # ms
 fade_direction = None
+transition = None  # Fade / Crossfade đang chạy (theo thời gian mô phỏng)
 
 # Message
 message_text = "Chào mừng bạn đã đến với Rộc Tưng 800 000 năm trước"
@@ -38,94 +69,117 @@ message_alpha = 0
 chapter_alpha = 0
 chapter_fade_speed = 5
 
+# Chapter / preload
+# module level chỉ được import khi chapter đó được preload / chơi
+LEVELS = {"chapter1": ("level1", "Level1"), "chapter2": ("level2", "Level2")}
+chosen_chapter = None
+hovered_chapter = None
+preloaders = {}
+# CULVER_RECORD=thư mục: ghi input + seed mỗi lần chơi level để phát lại bằng replay.py
+RECORD_DIR = os.environ.get("CULVER_RECORD")
+recorders = {}
+
+def level_class(tag):
+    module, name = LEVELS[tag]
+    return getattr(importlib.import_module(module), name)
+
+def make_level(tag):
+    if not RECORD_DIR:
+        return level_class(tag)(screen)
+    seed = random.SystemRandom().getrandbits(32)
+    level = level_class(tag)(screen, rng=random.Random(seed))
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    recorders[tag] = Recorder(level, seed, os.path.join(RECORD_DIR, f"{tag}-{seed}.culrec"))
+    return level
+
+# level đã dựng được giữ lại để quay lại chapter là chơi tiếp ngay
+level_pool = ScenePool(make_level)
+
 # ----------------- Load hình ảnh -----------------
 def load_image(path: str) -> pygame.Surface:
-    if not os.path.exists(path):
-        return None
-    return pygame.image.load(path).convert_alpha()
+    return assets.load(path, "best")
 
 bg_path = os.path.join(base_dir, "background", "background.png")
 play_btn_path = os.path.join(base_dir, "background", "play.png")
 welcome_bg_path = os.path.join(base_dir, "background", "welcomebackground.png")
+chapter_paths = [os.path.join(base_dir, "background", f"chapter{i}.png") for i in (1, 2)]
+
+background_surface = None
+play_surface_original = None
+startup_preload = None
 
-background_surface = load_image(bg_path)
-play_surface = load_image(play_btn_path)
-welcome_surface = load_image(welcome_bg_path)
+# ----------------- Khởi tạo -----------------
+def init(size=None, backend=None):
+    """Chỉ dựng những gì frame menu đầu tiên cần (cửa sổ, nền, nút chơi)
 
-if background_surface is None:
-    background_surface = pygame.Surface((WIDTH, HEIGHT))
-    background_surface.fill((100, 150, 200))
+    backend: "surface" hoặc "sdl2" (mặc định theo CULVER_BACKEND)
+    """
+    global screen, background_surface, play_surface_original
+    # không gọi pygame.init(): mixer / joystick không cần cho menu
+    pygame.display.init()
+    pygame.font.init()
+    screen = open_window(size or LOGICAL_SIZE, backend=backend, title="RPG Pixel Demo")
 
-if play_surface is None:
-    play_surface = pygame.Surface((200, 80))
-    play_surface.fill((255, 200, 0))
+    background_surface = load_image(bg_path)
+    if background_surface is None:
+        background_surface = solid_surface((WIDTH, HEIGHT), (100, 150, 200))
 
-play_surface_original = play_surface
+    play_surface_original = load_image(play_btn_path)
+    if play_surface_original is None:
+        play_surface_original = solid_surface((200, 80), (255, 200, 0))
+
+    update_layout()
 
 # ----------------- Layout cập nhật -----------------
 def update_layout():
-    """Cập nhật vị trí theo kích thước mới"""
+    """Cập nhật vị trí theo kích thước mới (chỉ gọi khi init / đổi cỡ cửa sổ / F11)"""
     global WIDTH, HEIGHT, title_pos, chapter_button_spacing
-    info = pygame.display.Info()
-    WIDTH, HEIGHT = info.current_w, info.current_h
+    WIDTH, HEIGHT = screen.get_size()
     title_pos = (WIDTH // 2, HEIGHT // 5)
     chapter_button_spacing = int(HEIGHT * 0.25)
-
-update_layout()
+    # cùng kích thước logic thì các surface đã scale vẫn dùng được
+    scale_cache.ensure_window((WIDTH, HEIGHT))
 
 # ----------------- Vẽ Menu -----------------
 def draw_menu():
-    scaled_bg = pygame.transform.scale(background_surface, (WIDTH, HEIGHT))
-    screen.blit(scaled_bg, (0, 0))
+    blit_scaled(screen, background_surface, (0, 0, WIDTH, HEIGHT))
 
     shorter_side = min(WIDTH, HEIGHT)
     target_height = max(1, int(shorter_side * 0.3))
     scale_ratio = target_height / play_surface_original.get_height()
     target_width = max(1, int(play_surface_original.get_width() * scale_ratio))
-    scaled_play = pygame.transform.smoothscale(play_surface_original, (target_width, target_height))
     center_x = WIDTH // 2
     center_y = HEIGHT // 2 + int(HEIGHT * 0.1)
-    base_rect = scaled_play.get_rect(center=(center_x, center_y))
+    base_rect = pygame.Rect(0, 0, target_width, target_height)
+    base_rect.center = (center_x, center_y)
 
-    mouse_x, mouse_y = pygame.mouse.get_pos()
+    mouse_x, mouse_y = mouse_pos()
     is_hovered = base_rect.collidepoint(mouse_x, mouse_y)
     hover_scale = 1.04
     if is_hovered:
-        scaled_w = int(target_width * hover_scale)
-        scaled_h = int(target_height * hover_scale)
-        scaled_play = pygame.transform.smoothscale(play_surface_original, (scaled_w, scaled_h))
-        draw_rect = scaled_play.get_rect(center=(center_x, center_y))
+        draw_rect = pygame.Rect(0, 0, int(target_width * hover_scale), int(target_height * hover_scale))
+        draw_rect.center = (center_x, center_y)
     else:
         draw_rect = base_rect
 
-    screen.blit(scaled_play, draw_rect)
+    blit_scaled(screen, play_surface_original, draw_rect, smooth=True)
     return draw_rect
 
 # ----------------- Fade -----------------
 def draw_fade():
-    fade_surface = pygame.Surface((WIDTH, HEIGHT))
-    fade_surface.fill((0, 0, 0))
-    fade_surface.set_alpha(fade_alpha)
-    screen.blit(fade_surface, (0, 0))
+    # overlay dùng lại giữa các frame, chỉ tạo lại khi đổi kích thước cửa sổ
+    if transition is not None:
+        transition.draw(screen)
 
 # ----------------- Outline text -----------------
 def render_text_with_outline(text, font, text_color, outline_color, outline_width):
-    base = font.render(text, True, text_color)
-    size = (base.get_width() + outline_width * 2, base.get_height() + outline_width * 2)
-    outline_image = pygame.Surface(size, pygame.SRCALPHA)
-
-    for dx in range(-outline_width, outline_width + 1):
-        for dy in range(-outline_width, outline_width + 1):
-            if dx * dx + dy * dy <= outline_width * outline_width:
-                pos = (dx + outline_width, dy + outline_width)
-                outline_image.blit(font.render(text, True, outline_color), pos)
-    outline_image.blit(base, (outline_width, outline_width))
-    return outline_image
-
-# ----------------- Vẽ Message -----------------
-def draw_message():
+    # Surface trả về dùng chung trong cache, chỉ được set_alpha chứ không vẽ đè
+    return text_renderer.render(text, font, text_color, outline_color, outline_width)
+
+# ----------------- Message -----------------
+def update_message():
     global message_alpha, message_active, state
-    elapsed = pygame.time.get_ticks() - message_start_time
+    elapsed = sim_time - message_start_time
 
     if elapsed < 500 and message_alpha < 255:
         message_alpha = min(255, message_alpha + 10)
@@ -135,147 +189,236 @@ def draw_message():
             message_active = False
             state = "chapter_select"
 
+def draw_message():
     # --- Nền welcome ---
+    welcome_surface = load_image(welcome_bg_path)
     if welcome_surface:
-        bg_scaled = pygame.transform.scale(welcome_surface, (WIDTH, HEIGHT))
-        screen.blit(bg_scaled, (0, 0))
+        blit_scaled(screen, welcome_surface, (0, 0, WIDTH, HEIGHT))
     else:
         screen.fill((0, 0, 0))
 
     # --- Chữ ---
     if message_alpha > 0:
-        text_surf = render_text_with_outline(message_text, font_vn, (255, 255, 255), (0, 0, 0), 3)
+        text_surf = render_text_with_outline(message_text, get_font("vn"), (255, 255, 255), (0, 0, 0), 3)
         text_surf.set_alpha(message_alpha)
         text_rect = text_surf.get_rect(center=(WIDTH // 2, HEIGHT // 2))
         screen.blit(text_surf, text_rect)
 
 # ----------------- Vẽ Chapter Select -----------------
 def draw_chapter_select():
-    global chapter_alpha
-    if chapter_alpha < 255:
-        chapter_alpha = min(255, chapter_alpha + chapter_fade_speed)
-
+    global hovered_chapter
+    hovered_chapter = None
     screen.fill((245, 222, 179))
 
-    title_surf = font_title.render("Chapter Select", True, (0, 0, 0))
+    title_surf = text_renderer.render("Chapter Select", get_font("title"), (0, 0, 0))
     title_surf.set_alpha(chapter_alpha)
     title_rect = title_surf.get_rect(center=title_pos)
     screen.blit(title_surf, title_rect)
 
-    chapter1_img = pygame.image.load(os.path.join(base_dir, "background", "chapter1.png")).convert_alpha()
-    chapter2_img = pygame.image.load(os.path.join(base_dir, "background", "chapter2.png")).convert_alpha()
+    chapter1_img, chapter2_img = (load_image(path) for path in chapter_paths)
 
     target_width = int(WIDTH * 0.4)
     scale_ratio = target_width / chapter1_img.get_width()
     target_height = int(chapter1_img.get_height() * scale_ratio)
 
-    chapter1_img = pygame.transform.smoothscale(chapter1_img, (target_width, target_height))
-    chapter2_img = pygame.transform.smoothscale(chapter2_img, (target_width, target_height))
+    chapter1_rect = pygame.Rect(0, 0, target_width, target_height)
+    chapter1_rect.center = (WIDTH // 2, HEIGHT // 2 - chapter_button_spacing // 2)
+    chapter2_rect = pygame.Rect(0, 0, target_width, target_height)
+    chapter2_rect.center = (WIDTH // 2, HEIGHT // 2 + chapter_button_spacing // 2)
 
-    chapter1_rect = chapter1_img.get_rect(center=(WIDTH // 2, HEIGHT // 2 - chapter_button_spacing // 2))
-    chapter2_rect = chapter2_img.get_rect(center=(WIDTH // 2, HEIGHT // 2 + chapter_button_spacing // 2))
-
-    mouse_x, mouse_y = pygame.mouse.get_pos()
+    mouse_x, mouse_y = mouse_pos()
     click = pygame.mouse.get_pressed()[0]
     hover_scale = 1.05
     selected_chapter = None
 
-    for img, rect, tag in [(chapter1_img, chapter1_rect, "chapter1"),
+    for src, rect, tag in [(chapter1_img, chapter1_rect, "chapter1"),
                            (chapter2_img, chapter2_rect, "chapter2")]:
         if rect.collidepoint(mouse_x, mouse_y):
-            scaled = pygame.transform.smoothscale(img, (int(target_width * hover_scale), int(target_height * hover_scale)))
-            new_rect = scaled.get_rect(center=rect.center)
-            screen.blit(scaled, new_rect)
+            new_rect = pygame.Rect(0, 0, int(target_width * hover_scale), int(target_height * hover_scale))
+            new_rect.center = rect.center
+            blit_scaled(screen, src, new_rect, smooth=True)
+            hovered_chapter = tag
             if click:
                 selected_chapter = tag
         else:
-            screen.blit(img, rect)
+            blit_scaled(screen, src, rect, smooth=True)
 
     return selected_chapter
 
-# ----------------- Main Loop -----------------
-def main():
-    global state, fade_alpha, fade_direction, chapter_alpha, WIDTH, HEIGHT, screen
-    chosen_chapter = None
-
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                if state == "menu":
-                    play_rect = draw_menu()
-                    if play_rect.collidepoint(mouse_x, mouse_y):
-                        state = "fade_out_menu"
-                        fade_direction = "out"
-                        fade_alpha = 0
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    sys.exit()
-                elif event.key == pygame.K_F11:
-                    try:
-                        pygame.display.toggle_fullscreen()
-                    except pygame.error:
-                        info = pygame.display.Info()
-                        flags = screen.get_flags()
-                        if flags & pygame.FULLSCREEN:
-                            screen = pygame.display.set_mode((1280, 720))
-                        else:
-                            screen = pygame.display.set_mode((info.current_w, info.current_h), pygame.FULLSCREEN)
-                    update_layout()
-
-        # ----- Logic theo state -----
-        if state == "menu":
-            draw_menu()
-        elif state == "fade_out_menu":
-            draw_menu()
-            draw_fade()
-            fade_alpha += fade_speed
-            if fade_alpha >= 255:
-                fade_alpha = 255
-                state = "message"
-                global message_start_time, message_active, message_alpha
-                message_start_time = pygame.time.get_ticks()
-                message_active = True
-                message_alpha = 0
-        elif state == "message":
-            draw_message()
-        elif state == "chapter_select":
-            selected_chapter = draw_chapter_select()
+# ----------------- Preload level -----------------
+def preload_chapter(tag):
+    """Bắt đầu giải mã ảnh của chapter trên thread nền (mỗi chapter một lần)"""
+    if tag not in preloaders:
+        preloaders[tag] = assets.preload(level_class(tag).asset_paths())
+    return preloaders[tag]
+
+def draw_loading():
+    screen.fill((0, 0, 0))
+    progress = preload_chapter(chosen_chapter).progress
+    bar = pygame.Rect(0, 0, int(WIDTH * 0.4), 16)
+    bar.center = (WIDTH // 2, HEIGHT // 2)
+    screen.fill((80, 80, 80), bar)
+    screen.fill((245, 222, 179), (bar.x, bar.y, int(bar.width * progress), bar.height))
+    label = text_renderer.render(f"Đang tải... {int(progress * 100)}%", get_font("game"), (255, 255, 255))
+    screen.blit(label, label.get_rect(midbottom=(WIDTH // 2, bar.top - 12)))
+
+def chapter_ready(tag):
+    if tag in level_pool:
+        return True
+    ready = preload_chapter(tag).done()
+    # preload lúc khởi động (thẻ chapter...) cũng phải xong: chạy chung thread pool,
+    # và lỗi giải mã của nó được báo ra ở đây trước khi vào level
+    return ready and (startup_preload is None or startup_preload.done())
+
+# ----------------- Update: một bước mô phỏng cố định -----------------
+def update_state():
+    global state, transition, chapter_alpha, sim_time
+    global message_start_time, message_active, message_alpha
+    sim_time += STEP_MS
+    if transition is not None:
+        transition.update(STEP_MS)
+
+    if state == "fade_out_menu":
+        if transition.done:
+            state = "message"
+            transition = None
+            message_start_time = sim_time
+            message_active = True
+            message_alpha = 0
+    elif state == "message":
+        update_message()
+    elif state in ("chapter_select", "fade_out_chapter"):
+        if chapter_alpha < 255:
+            chapter_alpha = min(255, chapter_alpha + chapter_fade_speed)
+        if state == "chapter_select" and transition is not None and transition.done:
+            transition = None
+
+# ----------------- Vẽ theo state -----------------
+def draw_state():
+    """Vẽ frame của state hiện tại, trả về chapter vừa được chọn (nếu có)"""
+    if state == "menu":
+        draw_menu()
+    elif state == "fade_out_menu":
+        draw_menu()
+        draw_fade()
+    elif state == "message":
+        draw_message()
+    elif state == "chapter_select":
+        selected = draw_chapter_select()
+        draw_fade()
+        return selected
+    elif state == "fade_out_chapter":
+        draw_chapter_select()
+        draw_fade()
+    elif state == "loading_chapter":
+        draw_loading()
+    return None
+
+# ----------------- Scene menu -----------------
+class MenuScene(Scene):
+    """Menu → message → chọn chapter; level được push lên trên từ level_pool"""
+
+    def __init__(self):
+        self.in_level = False
+
+    def enter(self):
+        global state, transition, chapter_alpha
+        if self.in_level:
+            # vừa thoát level → mờ dần frame cuối của level sang màn chọn chapter
+            self.in_level = False
+            audio.stop_music(fade_duration)
+            if chosen_chapter in recorders:
+                recorders[chosen_chapter].save()
+            state = "chapter_select"
+            transition = Crossfade(screen, fade_duration)
+            chapter_alpha = 0
+
+    def handle_event(self, event):
+        global state, transition, fade_direction, screen
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            mouse_x, mouse_y = mouse_pos()
+            if state == "menu":
+                play_rect = draw_menu()
+                if play_rect.collidepoint(mouse_x, mouse_y):
+                    state = "fade_out_menu"
+                    fade_direction = "out"
+                    transition = Fade(0, 255, fade_duration)
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.manager.clear()
+            elif event.key == pygame.K_F11:
+                # kích thước logic không đổi nên level trong pool vẫn dùng tiếp được,
+                # trừ khi SDL trả về surface màn hình mới (level giữ surface cũ)
+                old_screen, screen = screen, toggle_fullscreen(screen)
+                update_layout()
+                if screen is not old_screen:
+                    level_pool.clear()
+        elif event.type == pygame.VIDEORESIZE:
+            update_layout()
+
+    def update(self):
+        with profiler.phase("update"):
+            update_state()
+
+    def draw(self, alpha=1.0):
+        global state, transition, fade_direction, chosen_chapter, first_frame_ms, startup_preload
+        with profiler.phase("draw"):
+            selected_chapter = draw_state()
+        if state == "chapter_select":
+            # rê chuột lên thẻ chapter là bắt đầu giải mã ảnh của level đó
+            if hovered_chapter and hovered_chapter not in level_pool:
+                preload_chapter(hovered_chapter)
             if selected_chapter:
                 fade_direction = "out"
-                fade_alpha = 0
+                transition = Fade(0, 255, fade_duration)
                 state = "fade_out_chapter"
                 chosen_chapter = selected_chapter
-        elif state == "fade_out_chapter":
-            draw_chapter_select()
-            draw_fade()
-            fade_alpha += fade_speed
-            if fade_alpha >= 255:
-                fade_alpha = 255
-                if chosen_chapter == "chapter1":
-                    level = Level1(screen)
-                else:
-                    level = Level2(screen)
-                for alpha in range(255, -1, -int(fade_speed * 1.5)):
-                    screen.fill((0, 0, 0))
-                    fade_surface = pygame.Surface((WIDTH, HEIGHT))
-                    fade_surface.fill((0, 0, 0))
-                    fade_surface.set_alpha(alpha)
-                    screen.blit(fade_surface, (0, 0))
-                    pygame.display.flip()
-                    clock.tick(60)
-                level.run()
-                fade_alpha = 255
-                state = "chapter_select"
-                chapter_alpha = 0
-
-        pygame.display.flip()
-        clock.tick(60)
+                chapter_ready(chosen_chapter)
+        elif state == "fade_out_chapter" and transition.done:
+            # chưa preload xong thì hiện thanh tiến độ, vẫn xử lý event
+            state = "loading_chapter"
+
+        profiler.draw_overlay(screen)
+        with profiler.phase("present"):
+            present(screen)
+
+        if first_frame_ms is None:
+            first_frame_ms = (time.time() - STARTUP_T0) * 1000.0
+            if STARTUP_REPORT:
+                print(f"time-to-first-frame: {first_frame_ms:.1f} ms")
+                self.manager.clear()
+                return
+            # menu đã hiện → ảnh các màn sau giải mã song song trên thread pool
+            startup_preload = assets.preload([welcome_bg_path] + chapter_paths)
+            # mixer + bank SFX cũng mở sau frame đầu, không làm chậm lúc khởi động
+            audio.init()
+
+        if state == "loading_chapter" and chapter_ready(chosen_chapter):
+            level = level_pool.get(chosen_chapter)
+            # level tự sáng dần trong vòng lặp frame, không chặn event
+            level.transition = Fade(255, 0, fade_duration / 1.5)
+            self.in_level = True
+            audio.play_music(chosen_chapter, fade_ms=fade_duration)
+            self.manager.push(level)
 
+# ----------------- Main Loop -----------------
+def main():
+    init()
+    if GC_FREEZE:
+        # module + asset nạp lúc khởi động không bao giờ thành rác; để GC thế hệ 2
+        # (do list lệnh vẽ mỗi frame kích hoạt) khỏi duyệt lại chúng → bớt giật frame.
+        # Level dựng sau thời điểm này vẫn được GC thu dọn bình thường.
+        gc.collect()
+        gc.freeze()
+    stack = SceneStack(MenuScene())
+    try:
+        stack.run()
+    finally:
+        gc.unfreeze()
+    # đóng cửa sổ khi đang trong level thì chưa kịp ghi
+    for recorder in recorders.values():
+        recorder.save()
+    profiler.close()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,117 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+# Chạy không cần màn hình: dùng driver SDL "dummy" (đặt trước khi init pygame)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from audio import audio
+from controls import ScriptedControls
+from level1 import Level1
+from level2 import Level2
+from replay import Recorder
+
+LEVELS = {"level1": Level1, "level2": Level2}
+
+# Kịch bản mặc định cho soak test, phát lặp lại
+DEFAULT_SCRIPTS = {
+    # đi qua lại cả màn hình, giữ F để nhặt mọi viên đá đi ngang qua
+    "level1": [(150, "right+pick"), (300, "left+pick"), (150, "right+pick"), (20, "jump")],
+    # đi lại gần trâu để nó lao tới, thỉnh thoảng nhảy
+    "level2": [(120, "right"), (30, "right+jump"), (120, "left"), (30, "left+jump"), (60, "")],
+}
+
+
+def init_display(size=(1280, 720)) -> pygame.Surface:
+    if not pygame.get_init():
+        pygame.init()
+    screen = pygame.display.get_surface()
+    if screen is None or screen.get_size() != tuple(size):
+        screen = pygame.display.set_mode(size)
+    return screen
+
+
+# ----------------- Headless runner -----------------
+class HeadlessRunner:
+    """Chạy một level không vẽ, với RNG có seed và input theo kịch bản
+
+    Cùng seed + cùng kịch bản luôn cho cùng kết quả, nên dùng được cho
+    soak test trên máy build không có màn hình.
+    """
+
+    def __init__(self, level="level1", seed=0, script=None, loop=True, size=(1280, 720)):
+        self.level_name = level
+        self.seed = seed
+        screen = init_display(size)
+        self.controls = ScriptedControls(DEFAULT_SCRIPTS[level] if script is None else script, loop=loop)
+        self.level = LEVELS[level](screen, rng=random.Random(seed), controls_source=self.controls)
+        self.stats = {}
+        self._last = self.level.snapshot()
+
+    def step(self, n=1) -> dict:
+        observe = getattr(self, f"_observe_{self.level_name}")
+        for _ in range(n):
+            self.level.update()
+            snap = self.level.snapshot()
+            observe(self._last, snap)
+            self._last = snap
+        return self._last
+
+    def _count(self, name):
+        self.stats[name] = self.stats.get(name, 0) + 1
+
+    # ---- bộ đếm sự kiện theo level ----
+    def _observe_level1(self, prev, cur):
+        if sum(cur["collected"]) > sum(prev["collected"]):
+            self._count("picks")
+        if cur["stones"] != prev["stones"]:
+            self._count("wrong_combos")
+        if cur["reward"] and not prev["reward"]:
+            self._count("rewards")
+
+    def _observe_level2(self, prev, cur):
+        state, prev_state = cur["buffalo"][3], prev["buffalo"][3]
+        if state != prev_state:
+            self._count(f"buffalo_{state}")
+        if cur["invincible"] and not prev["invincible"]:
+            self._count("hits")
+        if prev["invincible"] and not cur["invincible"]:
+            self._count("invincible_end")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chạy level headless (soak test)")
+    parser.add_argument("level", choices=sorted(LEVELS))
+    parser.add_argument("--ticks", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", metavar="FILE", help="ghi input + seed ra file để phát lại bằng replay.py")
+    parser.add_argument("--audio", action="store_true", help="bật mixer (driver dummy) để chạy cả phần phát SFX")
+    args = parser.parse_args(argv)
+
+    if args.audio:
+        pygame.init()
+        audio.init()
+    runner = HeadlessRunner(args.level, seed=args.seed)
+    recorder = Recorder(runner.level, args.seed, args.record) if args.record else None
+    start = time.perf_counter()
+    final = runner.step(args.ticks)
+    elapsed = time.perf_counter() - start
+    if recorder is not None:
+        recorder.save()
+
+    print(f"{args.level}: {args.ticks} tick trong {elapsed:.2f}s ({args.ticks / elapsed:.0f} tick/s)")
+    for name, count in sorted(runner.stats.items()):
+        print(f"  {name}: {count}")
+    print(f"  trạng thái cuối: {final}")
+    if audio.ready:
+        print(f"  audio: {audio.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import numpy as np
+
+from assets import rle_sprite
+
+# ----------------- Mã trạng thái -----------------
+IDLE, CHARGE, OVERRUN, COOLDOWN = range(4)
+STATE_NAMES = ("idle", "charge", "overrun", "cooldown")
+
+
+# ----------------- Đàn trâu -----------------
+class Herd:
+    """Cả đàn trâu lưu trong mảng NumPy, mỗi bước cập nhật cả đàn một lượt
+
+    Máy trạng thái idle → charge → overrun → cooldown giống hệt con trâu
+    đơn cũ, chỉ khác là chạy theo mask trên mảng thay vì từng object.
+    `frames` là FrameSet dùng chung cho cả đàn.
+    """
+
+    animation_speed = 120
+    max_speed = 3
+    accel = 0.05
+    decel = 0.1
+    aggro_range = 250
+    charge_speed = 7
+    charge_overshoot = 200
+    overrun_ms = 1000
+    cooldown_ms = 2500
+
+    def __init__(self, frames, count, ground_y, world_width, rng, avoid_x=None, avoid_dist=300):
+        self.frames = frames
+        self.ground_y = ground_y
+        self.world_width = world_width
+        # sinh số ngẫu nhiên từ rng của level để cùng seed vẫn ra cùng kết quả
+        self.rng = np.random.default_rng(rng.getrandbits(64))
+
+        self.x = self.rng.integers(100, world_width - 200, count, endpoint=True).astype(np.float64)
+        if avoid_x is not None:
+            # không cho trâu xuất hiện ngay cạnh người chơi
+            near = np.abs(self.x - avoid_x) < avoid_dist
+            while near.any():
+                self.x[near] = self.rng.integers(100, world_width - 200, int(near.sum()), endpoint=True)
+                near = np.abs(self.x - avoid_x) < avoid_dist
+        self.prev_x = self.x.copy()
+        self.speed = np.zeros(count)
+        self.direction = self.rng.choice(np.array([-1, 1], dtype=np.int8), count)
+        self.state = np.full(count, IDLE, dtype=np.int8)
+        self.cooldown_timer = np.zeros(count)
+        self.charge_target_x = np.zeros(count)
+        self.index = np.zeros(count, dtype=np.int32)
+        self.timer = np.zeros(count)
+        # những con vừa chuyển sang charge ở bước này (level phát tiếng, tung bụi)
+        self.new_charges = np.zeros(0, dtype=np.intp)
+
+        img = frames.image(-1, 0)
+        self.width, self.height = img.get_size()
+        # ảnh để vẽ: cả đàn dùng chung, bản RLE blit nhanh hơn nhiều khi có hàng trăm con
+        self.sprites = {direction: [rle_sprite(frames.image(direction, i)) for i in range(len(frames))]
+                        for direction in (-1, 1)}
+
+    def __len__(self):
+        return len(self.x)
+
+    def update(self, player_rect, now, active=None):
+        """Một bước cho cả đàn; `active` (mảng bool) giới hạn những con được chạy"""
+        self.prev_x[:] = self.x
+        x, speed, direction, state = self.x, self.speed, self.direction, self.state
+        n = len(x)
+        # con ở chunk chưa nạp đứng yên tại chỗ
+        live = True if active is None else active
+
+        # hoạt ảnh
+        tick = live & (now - self.timer >= self.animation_speed)
+        self.index[tick] = (self.index[tick] + 1) % len(self.frames)
+        self.timer[tick] = now
+
+        # hết cooldown → idle, 50% quay lại chiều ngược
+        wake = live & (state == COOLDOWN) & (now - self.cooldown_timer >= self.cooldown_ms)
+        state[wake] = IDLE
+        direction[wake & (self.rng.random(n) < 0.5)] *= -1
+
+        # idle mà thấy player → charge
+        dx = player_rect.centerx - x
+        aggro = live & (state == IDLE) & (np.abs(dx) < self.aggro_range)
+        state[aggro] = CHARGE
+        direction[aggro] = np.where(dx[aggro] > 0, 1, -1)
+        overshoot = direction[aggro].astype(np.float64) * self.charge_overshoot
+        self.charge_target_x[aggro] = player_rect.centerx + overshoot
+        self.new_charges = np.flatnonzero(aggro)
+
+        # hành vi (mask lấy trước, mỗi con chỉ chạy một nhánh như if/elif cũ)
+        idle = live & (state == IDLE)
+        charge = live & (state == CHARGE)
+        overrun = live & (state == OVERRUN)
+        cooldown = live & (state == COOLDOWN)
+
+        speed[idle & (speed < self.max_speed)] += self.accel
+        x[idle] += direction[idle] * speed[idle]
+        wander = idle & (self.rng.random(n) < 0.005)
+        fast = speed > 0.3
+        speed[wander & fast] -= self.decel * 5
+        direction[wander & ~fast] *= -1
+
+        x[charge] += direction[charge] * self.charge_speed
+        # vượt mục tiêu → overrun (chạy thêm quán tính)
+        passed = charge & np.where(direction == 1, x >= self.charge_target_x, x <= self.charge_target_x)
+        state[passed] = OVERRUN
+        self.cooldown_timer[passed] = now
+
+        settle = overrun & (now - self.cooldown_timer >= self.overrun_ms)
+        state[settle] = COOLDOWN
+        self.cooldown_timer[settle] = now
+
+        speed[cooldown] = np.maximum(0, speed[cooldown] - self.decel * 2)
+        x[cooldown] += direction[cooldown] * speed[cooldown]
+
+        # giới hạn trong world
+        low = x < 80
+        x[low] = 80
+        direction[low] = 1
+        high = x > self.world_width - 80
+        x[high] = self.world_width - 80
+        direction[high] = -1
+
+    def stun(self, i, now):
+        """Con thứ i vừa húc trúng người chơi → cooldown ngay"""
+        self.state[i] = COOLDOWN
+        self.cooldown_timer[i] = now
+
+    def get_rect_mask(self, i):
+        direction, index = int(self.direction[i]), int(self.index[i])
+        img = self.frames.image(direction, index)
+        rect = img.get_rect(midbottom=(self.x[i], self.ground_y))
+        return rect, self.frames.mask(direction, index)
+
+    def describe(self, i) -> tuple:
+        return (float(self.x[i]), float(self.speed[i]), int(self.direction[i]), STATE_NAMES[self.state[i]])
+
+    def counts(self) -> tuple:
+        """Số con đang ở từng trạng thái, theo thứ tự STATE_NAMES"""
+        return tuple(np.bincount(self.state, minlength=len(STATE_NAMES)).tolist())
+
+    def blits(self, alpha=1.0, camera_x=0, view_width=None) -> list:
+        """Danh sách (surface, vị trí) của những con nằm trong màn hình, để vẽ một lần bằng blits"""
+        xs = self.prev_x + (self.x - self.prev_x) * alpha - camera_x
+        # bỏ những con nằm ngoài camera trước khi dựng danh sách
+        shown = slice(None) if view_width is None else np.flatnonzero(
+            (xs > -self.width / 2) & (xs < view_width + self.width / 2))
+        # mọi frame cùng kích thước: góc trái trên tính như get_rect(midbottom=...)
+        # (tâm làm tròn nửa ra xa số 0 như pygame.Rect)
+        xs = xs[shown]
+        lefts = (np.trunc(xs + np.copysign(0.5, xs)).astype(np.intp) - self.width // 2).tolist()
+        top = self.ground_y - self.height
+        left_sprites, right_sprites = self.sprites[-1], self.sprites[1]
+        return [((right_sprites if direction == 1 else left_sprites)[index], (x, top))
+                for x, direction, index in zip(lefts, self.direction[shown].tolist(), self.index[shown].tolist())]
+
+    def draw(self, dest, alpha=1.0, camera_x=0, view_width=None):
+        dest.blits(self.blits(alpha, camera_x, view_width))
@@ -4,12 +4,46 @@ import os
 import random
 import math
 
-
-class Level1:
-    def __init__(self, screen):
+import controls
+import collision
+import particles
+from assets import assets, solid_surface
+from audio import audio
+from atlas import atlas
+from profiler import profiler
+from scenes import Scene, SceneStack
+from render import RenderQueue, Z_EFFECTS, Z_PLAYER, Z_WORLD, make_renderer, mirrored
+from timestep import FixedTimestep, lerp
+from world import Camera, ChunkStreamer, WORLD_SCREENS
+from parallax import Parallax
+from text import text_renderer
+
+class Level1(Scene):
+    @staticmethod
+    def asset_paths():
+        """Các ảnh level cần, để preload trên thread nền trước khi vào level"""
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        bg_dir = os.path.join(base_dir, "background")
+        player_dir = os.path.join(base_dir, "player")
+        names = ("nenlevel1.jpg", "dat.jpg", "stone1.png", "stone2.png", "stone3.png", "arrow.png", "stonereal.png")
+        # sprite đã bake thì chỉ cần giải mã ảnh atlas
+        return atlas.preload_paths(
+            [os.path.join(bg_dir, name) for name in names]
+            + [os.path.join(player_dir, "stand0.png")]
+            + [os.path.join(player_dir, f"walkleft{i}.png") for i in range(5)])
+
+    def __init__(self, screen, dirty=None, rng=None, controls_source=None, world_screens=None):
         self.screen = screen
-        self.clock = pygame.time.Clock()
-        self.running = True
+        self.timestep = FixedTimestep()
+        # thời gian mô phỏng (ms), chỉ tăng theo từng bước cố định
+        self.now = 0.0
+        self.tick = 0
+        self.transition = None
+
+        # --- Input / RNG (có thể thay bằng kịch bản + seed khi chạy headless) ---
+        self.rng = rng or random.Random()
+        self.controls = controls_source or controls.KeyboardControls()
+        self.actions = 0
 
         # --- Movement / Physics ---
         self.player_speed = 4
@@ -19,46 +53,37 @@ class Level1:
         self.on_ground = True
 
         self.WIDTH, self.HEIGHT = screen.get_size()
+        # world dài nhiều màn hình, chia chunk rộng một màn hình
+        self.world_width = self.WIDTH * (world_screens or WORLD_SCREENS)
         base_dir = os.path.dirname(os.path.abspath(__file__))
 
         # --- Background ---
         bg_path = os.path.join(base_dir, "background", "nenlevel1.jpg")
-        if os.path.exists(bg_path):
-            bg_raw = pygame.image.load(bg_path).convert()
-            self.background = pygame.transform.scale(bg_raw, (self.WIDTH, self.HEIGHT))
-        else:
-            self.background = pygame.Surface((self.WIDTH, self.HEIGHT))
-            self.background.fill((100, 200, 100))
+        self.background = assets.load(bg_path, "opaque", (self.WIDTH, self.HEIGHT))
+        if self.background is None:
+            self.background = solid_surface((self.WIDTH, self.HEIGHT), (100, 200, 100))
 
         # --- Ground ---
         ground_path = os.path.join(base_dir, "background", "dat.jpg")
-        if os.path.exists(ground_path):
-            ground_raw = pygame.image.load(ground_path).convert_alpha()
-        else:
-            ground_raw = pygame.Surface((100, 100))
-            ground_raw.fill((139, 69, 19))
         ground_height = self.HEIGHT // 6
-        self.ground = pygame.transform.scale(ground_raw, (self.WIDTH, ground_height))
+        self.ground = assets.load(ground_path, "best", (self.WIDTH, ground_height))
+        if self.ground is None:
+            self.ground = solid_surface((self.WIDTH, ground_height), (139, 69, 19))
         self.ground_rect = self.ground.get_rect(midbottom=(self.WIDTH // 2, self.HEIGHT))
 
         # --- Player images ---
         player_dir = os.path.join(base_dir, "player")
 
         def safe_load(name):
-            path = os.path.join(player_dir, name)
-            if os.path.exists(path):
-                img = pygame.image.load(path).convert_alpha()
-                img = pygame.transform.scale(img, (120, 160))
+            img = atlas.load(os.path.join(player_dir, name), (120, 160))
+            if img is not None:
                 return img
-            else:
-                surf = pygame.Surface((120, 160))
-                surf.fill((255, 0, 0))
-                return surf
+            return solid_surface((120, 160), (255, 0, 0))
 
         self.stand_images = [safe_load("stand0.png")]
         walk_left_imgs = [safe_load(f"walkleft{i}.png") for i in range(5)]
         self.walk_left_images = walk_left_imgs
-        self.walk_right_images = [pygame.transform.flip(img, True, False) for img in walk_left_imgs]
+        self.walk_right_images = [mirrored(img) for img in walk_left_imgs]
 
         # --- Player state ---
         self.direction = "right"
@@ -66,11 +91,12 @@ class Level1:
         self.current_images = self.stand_images
         self.player_index = 0
         self.animation_speed_ms = 120
-        self.animation_timer = pygame.time.get_ticks()
+        self.animation_timer = self.now
 
         # --- Player position ---
         self.player_x = self.WIDTH // 2
         self.player_y = self.ground_rect.top + 80
+        self.prev_player_x, self.prev_player_y = self.player_x, self.player_y
 
         # --- Font ---
         font_path = os.path.join(base_dir, "font", "DejaVuSans.ttf")
@@ -79,15 +105,26 @@ class Level1:
         else:
             self.font = pygame.font.SysFont("arial", 32)
 
+        # --- Collision world: đá là lớp PICKUP ---
+        self.colliders = collision.CollisionWorld()
+
+        # --- Camera + chunk: chỉ đá thuộc chunk gần camera mới có trong collision world ---
+        self.camera = Camera(self.WIDTH, self.world_width, self.player_x - self.WIDTH / 2)
+        self.streamer = ChunkStreamer(self.world_width, self.WIDTH, self.load_chunk, self.unload_chunk)
+
+        # --- Parallax: cảnh nền cuộn chậm, đất cuộn cùng world ---
+        self.parallax = Parallax(self.WIDTH)
+        self.parallax.add(self.background, 0, 0.3)
+        self.parallax.add(self.ground, self.ground_rect.top, 1.0)
+        self.static_x = None  # vị trí camera lúc ghép lớp nền gần nhất
+
         # --- Stones ---
         stone_dir = os.path.join(base_dir, "background")
         def load_stone(name):
-            path = os.path.join(stone_dir, name)
-            if os.path.exists(path):
-                return pygame.transform.scale(pygame.image.load(path).convert_alpha(), (80, 80))
-            s = pygame.Surface((80, 80))
-            s.fill((120, 120, 120))
-            return s
+            img = atlas.load(os.path.join(stone_dir, name), (80, 80))
+            if img is not None:
+                return img
+            return solid_surface((80, 80), (120, 120, 120))
 
         self.stone_img = [
             load_stone("stone1.png"),
@@ -98,63 +135,79 @@ class Level1:
         self.num_stones = len(self.stone_img)
         self.collected = [False] * self.num_stones
         self.randomize_stones()
+        self.streamer.update(self.camera.x, self.WIDTH)
 
         # --- Arrow indicator ---
-        arrow_path = os.path.join(stone_dir, "arrow.png")
-        if os.path.exists(arrow_path):
-            self.arrow = pygame.image.load(arrow_path).convert_alpha()
-            self.arrow = pygame.transform.scale(self.arrow, (60, 60))
-            self.arrow = pygame.transform.flip(self.arrow, False, True)
+        arrow = atlas.load(os.path.join(stone_dir, "arrow.png"), (60, 60))
+        if arrow is not None:
+            self.arrow = mirrored(arrow, False, True)
         else:
-            self.arrow = pygame.Surface((60, 60))
-            self.arrow.fill((255, 255, 0))
+            self.arrow = solid_surface((60, 60), (255, 255, 0))
         self.arrow_y_offset = 0
-        self.arrow_timer = pygame.time.get_ticks()
 
         # --- Reward ---
-        stonereal_path = os.path.join(stone_dir, "stonereal.png")
-        if os.path.exists(stonereal_path):
-            self.stonereal = pygame.transform.scale(
-                pygame.image.load(stonereal_path).convert_alpha(), (180, 180)
-            )
-        else:
-            self.stonereal = pygame.Surface((180, 180))
-            self.stonereal.fill((255, 255, 0))
+        self.stonereal = atlas.load(os.path.join(stone_dir, "stonereal.png"), (180, 180))
+        if self.stonereal is None:
+            self.stonereal = solid_surface((180, 180), (255, 255, 0))
         self.show_reward = False
+        self.near_stones = []
 
         # --- Combo logic ---
         self.selection_order = []
 
+        # --- Hạt: tia lửa khi nhặt đá (toạ độ world), chùm sáng khi rìu hiện ra ---
+        self.sparks = particles.sparks()
+        self.reward_burst = particles.burst()
+        self.emitters = [self.sparks, self.reward_burst]
+
+        # --- Renderer: lớp nền ghép từ parallax, chỉ ghép lại khi camera cuộn ---
+        self.renderer = make_renderer(screen, dirty)
+        # lệnh vẽ của từng frame gom lại, sắp theo z rồi vẽ một lần
+        self.queue = RenderQueue()
+
     # -----------------------------
     # Utility: randomize stone positions
     # -----------------------------
     def randomize_stones(self):
         self.stone_positions = []
         for _ in range(self.num_stones):
-            x = random.randint(100, self.WIDTH - 100)
+            x = self.rng.randint(100, self.world_width - 100)
             y = self.ground_rect.top + 10
             self.stone_positions.append(pygame.Vector2(x, y))
+        self.sync_stones()
+
+    def sync_stones(self):
+        """Chỉ những viên chưa nhặt, thuộc chunk đang nạp mới nằm trong collision world"""
+        for i in range(self.num_stones):
+            if self.collected[i] or not self.streamer.is_resident(self.stone_positions[i].x):
+                self.colliders.remove(i)
+            else:
+                self.colliders.add(i, self.stone_rect(i), collision.PICKUP)
 
     # -----------------------------
     # Input
     # -----------------------------
     def handle_input(self):
-        keys = pygame.key.get_pressed()
+        actions = self.actions
         moving = False
 
-        if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+        if actions & controls.LEFT:
             self.player_x -= self.player_speed
             self.direction = "left"
             moving = True
-        elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+        elif actions & controls.RIGHT:
             self.player_x += self.player_speed
             self.direction = "right"
             moving = True
 
-        if (keys[pygame.K_UP] or keys[pygame.K_SPACE] or keys[pygame.K_w]) and self.on_ground:
+        if actions & controls.JUMP and self.on_ground:
             self.vel_y = -self.jump_strength
+            audio.play("jump")
             self.on_ground = False
 
+        # không đi ra ngoài world (camera cũng dừng ở mép)
+        self.player_x = max(40, min(self.player_x, self.world_width - 40))
+
         self.moving = moving
         if self.moving:
             if self.direction == "left":
@@ -192,7 +245,7 @@ class Level1:
     def update_animation(self):
         if not self.current_images:
             self.current_images = self.stand_images
-        now = pygame.time.get_ticks()
+        now = self.now
         if now - self.animation_timer >= self.animation_speed_ms:
             self.animation_timer = now
             self.player_index = (self.player_index + 1) % len(self.current_images)
@@ -202,16 +255,10 @@ class Level1:
     # Draw text with outline
     # -----------------------------
     def draw_text_center(self, text, y, color=(255, 255, 255), outline_color=(0, 0, 0), outline_width=2):
-        text_surface = self.font.render(text, True, color)
-        text_rect = text_surface.get_rect(center=(self.WIDTH // 2, y))
-        for dx in (-outline_width, 0, outline_width):
-            for dy in (-outline_width, 0, outline_width):
-                if dx == 0 and dy == 0:
-                    continue
-                outline_surface = self.font.render(text, True, outline_color)
-                outline_rect = outline_surface.get_rect(center=(self.WIDTH // 2 + dx, y + dy))
-                self.screen.blit(outline_surface, outline_rect)
-        self.screen.blit(text_surface, text_rect)
+        surf, rect = text_renderer.placed(text, self.font, color, outline_color, outline_width,
+                                          center=(self.WIDTH // 2, y))
+        self.queue.add(Z_WORLD, surf, rect)
+        return rect
 
     # -----------------------------
     # Pick logic
@@ -223,13 +270,20 @@ class Level1:
         # Nhặt viên thứ i
         if not self.collected[i]:
             self.collected[i] = True
+            self.colliders.remove(i)
             self.selection_order.append(i)
+            audio.play("pick")
+            rect = self.stone_rect(i)
+            self.sparks.emit(40, rect.centerx, rect.centery, speed=(2.0, 6.0), angle=(20.0, 160.0),
+                             life=(250.0, 500.0), spread=rect.width / 4)
 
         # Khi đã chọn 2 viên → kiểm tra combo
         if len(self.selection_order) == 2:
             a, b = self.selection_order
             if set((a, b)) == {0, 1}:
                 self.show_reward = True
+                self.reward_burst.emit(300, self.WIDTH // 2, 240, speed=(2.0, 9.0),
+                                       life=(600.0, 1400.0), spread=40)
             else:
                 # Chọn sai → reset toàn bộ
                 self.collected = [False] * self.num_stones
@@ -237,51 +291,143 @@ class Level1:
             self.selection_order.clear()
 
     # -----------------------------
-    # Main loop
+    # Chunk streaming
     # -----------------------------
-    def run(self):
-        while self.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+    def load_chunk(self, chunk):
+        self.sync_stones()
 
+    def unload_chunk(self, chunk):
+        self.sync_stones()
+
+    def stone_rect(self, i):
+        return self.stone_img[i].get_rect(midbottom=(self.stone_positions[i].x, self.ground_rect.top + 10))
+
+    # -----------------------------
+    # Update: một bước mô phỏng cố định
+    # -----------------------------
+    def update(self):
+        self.now += self.timestep.step_ms
+        self.prev_player_x, self.prev_player_y = self.player_x, self.player_y
+        if self.transition is not None:
+            self.transition.update(self.timestep.step_ms)
+            if self.transition.done:
+                self.transition = None
+
+        with profiler.phase("input"):
+            self.actions = self.controls.poll(self.tick)
+            self.tick += 1
             self.handle_input()
+        with profiler.phase("physics"):
             self.apply_physics()
+        with profiler.phase("animation"):
             self.update_animation()
 
-            self.screen.blit(self.background, (0, 0))
-            self.screen.blit(self.ground, self.ground_rect.topleft)
+        with profiler.phase("stream"):
+            self.camera.follow(self.player_x)
+            self.streamer.update(self.camera.x, self.WIDTH)
 
+        with profiler.phase("collision"):
             player_rect = pygame.Rect(self.player_x - 40, self.player_y - 160, 80, 160)
+            self.near_stones = []
+            # broadphase chỉ trả về các viên ở gần; kiểm tra lại vì nhặt sai sẽ xếp lại đá
+            for i in sorted(self.colliders.query(player_rect, collision.PICKUP)):
+                if not self.collected[i] and player_rect.colliderect(self.stone_rect(i)):
+                    self.near_stones.append(i)
+                    if self.actions & controls.PICK:
+                        self.handle_pick(i)
+
+        with profiler.phase("particles"):
+            for emitter in self.emitters:
+                emitter.update(self.timestep.step_ms)
+
+    def snapshot(self) -> dict:
+        """Trạng thái mô phỏng dạng dict thuần, dùng để so sánh khi chạy headless"""
+        return {
+            "tick": self.tick,
+            "player": (self.player_x, self.player_y, self.vel_y),
+            "stones": tuple((pos.x, pos.y) for pos in self.stone_positions),
+            "collected": tuple(self.collected),
+            "selection": tuple(self.selection_order),
+            "reward": self.show_reward,
+        }
+
+    def step(self, n=1):
+        """Chạy n bước mô phỏng, không vẽ (dùng để tua nhanh)"""
+        for _ in range(n):
+            self.update()
+
+    # -----------------------------
+    # Draw: nội suy vị trí giữa hai bước
+    # -----------------------------
+    def draw(self, alpha=1.0):
+        with profiler.phase("blit"):
+            self.draw_world(alpha)
+            if self.transition is not None:
+                self.transition.draw(self.renderer)
+            profiler.draw_overlay(self.renderer)
+        with profiler.phase("present"):
+            self.renderer.present()
+
+    def draw_world(self, alpha):
+        cam = self.camera.offset(alpha)
+        if cam != self.static_x or self.renderer.static is None:
+            # camera cuộn → ghép lại nền từ các dải parallax (≤ 2 blit mỗi lớp)
+            self.renderer.set_static(self.parallax.blits(cam))
+            self.static_x = cam
+        self.renderer.begin()
+        queue = self.queue
+
+        # Draw stones
+        for i in range(self.num_stones):
+            if not self.collected[i] and self.streamer.is_resident(self.stone_positions[i].x):
+                rect = self.stone_rect(i).move(-cam, 0)
+                queue.add(Z_WORLD, self.stone_img[i], rect)
+                queue.add(Z_WORLD, self.arrow, (rect.centerx - 30, rect.top - 60 + self.arrow_y_offset))
+                if i in self.near_stones:
+                    self.draw_text_center("Nhấn F để nhặt", rect.y - 60, (255, 255, 0))
+
+        # Reward
+        if self.show_reward:
+            self.draw_text_center("Bạn đã chế tác được rìu tay!", 100, (255, 255, 255))
+            queue.add(Z_WORLD, self.stonereal, (self.WIDTH // 2 - 90, 150))
+
+        for emitter in self.emitters:
+            queue.extend(Z_EFFECTS, emitter.blits(alpha, cam, self.WIDTH))
 
-            # Draw stones
-            for i, pos in enumerate(self.stone_positions):
-                if not self.collected[i]:
-                    rect = self.stone_img[i].get_rect(midbottom=(pos.x, self.ground_rect.top + 10))
-                    self.screen.blit(self.stone_img[i], rect)
-                    self.screen.blit(self.arrow, (rect.centerx - 30, rect.top - 60 + self.arrow_y_offset))
-
-                    if player_rect.colliderect(rect):
-                        self.draw_text_center("Nhấn F để nhặt", rect.y - 60, (255, 255, 0))
-                        keys = pygame.key.get_pressed()
-                        if keys[pygame.K_f]:
-                            self.handle_pick(i)
-
-            # Reward
-            if self.show_reward:
-                self.draw_text_center("Bạn đã chế tác được rìu tay!", 100, (255, 255, 255))
-                self.screen.blit(self.stonereal, (self.WIDTH // 2 - 90, 150))
-
-            # Draw player safely
-            if not self.current_images:
-                self.current_images = self.stand_images
-            if self.player_index >= len(self.current_images):
-                self.player_index = 0
-
-            img = self.current_images[self.player_index]
-            player_rect = img.get_rect(midbottom=(self.player_x, self.player_y))
-            self.screen.blit(img, player_rect)
-
-            pygame.display.flip()
-            self.clock.tick(60)
+        # Draw player safely
+        if not self.current_images:
+            self.current_images = self.stand_images
+        if self.player_index >= len(self.current_images):
+            self.player_index = 0
+
+        img = self.current_images[self.player_index]
+        pos = (lerp(self.prev_player_x, self.player_x, alpha) - cam, lerp(self.prev_player_y, self.player_y, alpha))
+        player_rect = img.get_rect(midbottom=pos)
+        queue.add(Z_PLAYER, img, player_rect)
+        queue.flush(self.renderer)
+
+    # -----------------------------
+    # Main loop
+    # -----------------------------
+    # Scene: ESC quay lại màn trước, level được giữ nguyên để chơi tiếp
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE and self.manager:
+            self.manager.pop()
+
+    def enter(self):
+        # scene khác vừa vẽ đè lên màn hình → frame đầu vẽ lại toàn bộ
+        self.renderer.invalidate()
+
+    def release(self):
+        self.renderer.static = None
+        self.streamer.clear()
+        # streamer.clear() bỏ chunk khi chúng vẫn còn trong resident → gỡ hết collider ở đây
+        self.colliders.clear()
+
+    def run(self, transition=None):
+        """Chạy level như một stack riêng (khi không đi qua game.py)"""
+        # transition (vd. Fade) chạy ngay trong vòng lặp frame của level
+        self.transition = transition
+        if not SceneStack(self).run():
+            pygame.quit()
+            sys.exit()
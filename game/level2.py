@@ -3,182 +3,124 @@ import sys
 import os
 import random
 
-
-class Buffalo:
-    def __init__(self, base_dir, ground_y, screen_width):
-        self.images = []
-        self.masks = []
-        for i in range(6):
-            path = os.path.join(base_dir, f"tile{i}.png")
-            if os.path.exists(path):
-                img = pygame.image.load(path).convert_alpha()
-                img = pygame.transform.scale(img, (160, 120))
-                self.images.append(img)
-                self.masks.append(pygame.mask.from_surface(img))
-
-        if not self.images:
-            surf = pygame.Surface((160, 120), pygame.SRCALPHA)
-            pygame.draw.rect(surf, (255, 0, 0), surf.get_rect(), 2)
-            self.images = [surf]
-            self.masks = [pygame.mask.from_surface(surf)]
-
-        self.index = 0
-        self.timer = pygame.time.get_ticks()
-        self.animation_speed = 120
-
-        self.x = random.randint(100, screen_width - 200)
-        self.y = ground_y
-        self.speed = 0
-        self.max_speed = 3
-        self.accel = 0.05
-        self.decel = 0.1
-        self.direction = random.choice([-1, 1])
-        self.ground_y = ground_y
-        self.screen_width = screen_width
-
-        self.aggro_range = 250
-        self.charge_speed = 7
-        self.state = "idle"  # idle | charge | overrun | cooldown
-        self.cooldown_timer = 0
-        self.charge_target_x = None
-
-    def update(self, player_rect):
-        now = pygame.time.get_ticks()
-
-        # hoạt ảnh
-        if now - self.timer >= self.animation_speed:
-            self.index = (self.index + 1) % len(self.images)
-            self.timer = now
-
-        # hết cooldown → idle
-        if self.state == "cooldown" and now - self.cooldown_timer >= 2500:
-            self.state = "idle"
-            # ✨ có thể quay lại chiều ngược (50%)
-            if random.random() < 0.5:
-                self.direction *= -1
-
-        dx = player_rect.centerx - self.x
-        distance = abs(dx)
-
-        # idle mà thấy player → charge
-        if self.state == "idle" and distance < self.aggro_range:
-            self.state = "charge"
-            self.direction = 1 if dx > 0 else -1
-            self.charge_target_x = player_rect.centerx + self.direction * 200
-
-        # hành vi
-        if self.state == "idle":
-            if self.speed < self.max_speed:
-                self.speed += self.accel
-            self.x += self.direction * self.speed
-
-            if random.random() < 0.005:
-                if self.speed > 0.3:
-                    self.speed -= self.decel * 5
-                else:
-                    self.direction *= -1
-
-        elif self.state == "charge":
-            self.x += self.direction * self.charge_speed
-            # nếu vượt mục tiêu → overrun (chạy thêm quán tính)
-            if (self.direction == 1 and self.x >= self.charge_target_x) or \
-               (self.direction == -1 and self.x <= self.charge_target_x):
-                self.state = "overrun"
-                self.cooldown_timer = now
-
-        elif self.state == "overrun":
-            if now - self.cooldown_timer >= 1000:
-                self.state = "cooldown"
-                self.cooldown_timer = now
-
-        elif self.state == "cooldown":
-            self.speed = max(0, self.speed - self.decel * 2)
-            self.x += self.direction * self.speed
-
-        # giới hạn màn hình
-        if self.x < 80:
-            self.x = 80
-            self.direction = 1
-        elif self.x > self.screen_width - 80:
-            self.x = self.screen_width - 80
-            self.direction = -1
-
-    def draw(self, screen):
-        img = self.images[self.index]
-        mask = self.masks[self.index]
-
-        if self.direction == 1:
-            img = pygame.transform.flip(img, True, False)
-            mask = pygame.mask.from_surface(img)
-
-        rect = img.get_rect(midbottom=(self.x, self.ground_y))
-        screen.blit(img, rect)
-        return rect, mask
-
-
-class Level2:
-    def __init__(self, screen):
+import controls
+import collision
+import particles
+from assets import assets, solid_surface
+from audio import audio
+from atlas import atlas
+from profiler import profiler
+from scenes import Scene, SceneStack
+from render import RenderQueue, Z_EFFECTS, Z_PLAYER, Z_WORLD, make_renderer
+from timestep import FixedTimestep, lerp
+from sprites import FrameSet
+from world import Camera, ChunkStreamer, WORLD_SCREENS
+from parallax import Parallax
+from herd import Herd, STATE_NAMES
+
+def load_buffalo_frames(base_dir) -> FrameSet:
+    images = []
+    for i in range(6):
+        img = atlas.load(os.path.join(base_dir, f"tile{i}.png"), (160, 120))
+        if img is not None:
+            images.append(img)
+
+    if not images:
+        surf = solid_surface((160, 120), (0, 0, 0, 0), alpha=True)
+        pygame.draw.rect(surf, (255, 0, 0), surf.get_rect(), 2)
+        images = [surf]
+
+    # ảnh gốc quay trái; bản lật + mask dựng sẵn một lần, cả đàn dùng chung
+    return FrameSet(images, facing=-1)
+
+
+class Level2(Scene):
+    # Level2 nhảy bằng UP/SPACE, không dùng W
+    KEYMAP = {**controls.DEFAULT_KEYMAP, controls.JUMP: (pygame.K_UP, pygame.K_SPACE)}
+    # số trâu trong đàn (CULVER_HERD), mặc định một con như thiết kế gốc
+    HERD_SIZE = int(os.environ.get("CULVER_HERD", "1"))
+
+    @staticmethod
+    def asset_paths():
+        """Các ảnh level cần, để preload trên thread nền trước khi vào level"""
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        bg_dir = os.path.join(base_dir, "background")
+        player_dir = os.path.join(base_dir, "player")
+        npc_dir = os.path.join(base_dir, "buffalo")
+        # sprite đã bake thì chỉ cần giải mã ảnh atlas
+        return atlas.preload_paths(
+            [os.path.join(bg_dir, "nenlevel2.png"), os.path.join(bg_dir, "dat.jpg")]
+            + [os.path.join(player_dir, f"stand{i}.png") for i in range(2)]
+            + [os.path.join(player_dir, f"walkleft{i}.png") for i in range(5)]
+            + [os.path.join(npc_dir, f"tile{i}.png") for i in range(6)])
+
+    def __init__(self, screen, dirty=None, rng=None, controls_source=None, herd_size=None, world_screens=None):
         self.screen = screen
-        self.clock = pygame.time.Clock()
-        self.running = True
+        self.timestep = FixedTimestep()
+        # thời gian mô phỏng (ms), chỉ tăng theo từng bước cố định
+        self.now = 0.0
+        self.tick = 0
+        self.transition = None
+
+        # input / RNG (có thể thay bằng kịch bản + seed khi chạy headless)
+        self.rng = rng or random.Random()
+        self.controls = controls_source or controls.KeyboardControls(self.KEYMAP)
+        self.actions = 0
 
         self.WIDTH, self.HEIGHT = screen.get_size()
+        # world dài nhiều màn hình, chia chunk rộng một màn hình
+        self.world_width = self.WIDTH * (world_screens or WORLD_SCREENS)
         base_dir = os.path.dirname(os.path.abspath(__file__))
 
         # background
         bg_path = os.path.join(base_dir, "background", "nenlevel2.png")
-        if os.path.exists(bg_path):
-            bg_raw = pygame.image.load(bg_path).convert()
-            self.background = pygame.transform.scale(bg_raw, (self.WIDTH, self.HEIGHT))
-        else:
-            self.background = pygame.Surface((self.WIDTH, self.HEIGHT))
-            self.background.fill((150, 200, 250))
+        self.background = assets.load(bg_path, "opaque", (self.WIDTH, self.HEIGHT))
+        if self.background is None:
+            self.background = solid_surface((self.WIDTH, self.HEIGHT), (150, 200, 250))
 
         # ground
         ground_path = os.path.join(base_dir, "background", "dat.jpg")
-        if os.path.exists(ground_path):
-            ground_raw = pygame.image.load(ground_path).convert_alpha()
-        else:
-            ground_raw = pygame.Surface((100, 100))
-            ground_raw.fill((139, 69, 19))
         ground_height = self.HEIGHT // 6
-        self.ground = pygame.transform.scale(ground_raw, (self.WIDTH, ground_height))
+        self.ground = assets.load(ground_path, "best", (self.WIDTH, ground_height))
+        if self.ground is None:
+            self.ground = solid_surface((self.WIDTH, ground_height), (139, 69, 19))
         self.ground_rect = self.ground.get_rect(midbottom=(self.WIDTH // 2, self.HEIGHT))
 
         # ✅ Player animation
         player_dir = os.path.join(base_dir, "player")
         self.anim_stand = []
         for i in range(2):
-            p = os.path.join(player_dir, f"stand{i}.png")
-            if os.path.exists(p):
-                img = pygame.image.load(p).convert_alpha()
-                self.anim_stand.append(pygame.transform.scale(img, (100, 150)))
+            img = atlas.load(os.path.join(player_dir, f"stand{i}.png"), (100, 150))
+            if img is not None:
+                self.anim_stand.append(img)
 
         self.anim_walk = []
-        for i in range(6):
-            p = os.path.join(player_dir, f"walkleft{i}.png")
-            if os.path.exists(p):
-                img = pygame.image.load(p).convert_alpha()
-                self.anim_walk.append(pygame.transform.scale(img, (100, 150)))
+        for i in range(5):
+            img = atlas.load(os.path.join(player_dir, f"walkleft{i}.png"), (100, 150))
+            if img is not None:
+                self.anim_walk.append(img)
 
         # fallback
         if not self.anim_stand:
-            surf = pygame.Surface((100, 150))
-            surf.fill((255, 255, 0))
-            self.anim_stand = [surf]
+            self.anim_stand = [solid_surface((100, 150), (255, 255, 0))]
         if not self.anim_walk:
-            surf = pygame.Surface((100, 150))
-            surf.fill((0, 255, 0))
-            self.anim_walk = [surf]
+            self.anim_walk = [solid_surface((100, 150), (0, 255, 0))]
+
+        # ảnh gốc quay trái; dựng sẵn bộ trái/phải và mask cho từng trạng thái
+        self.player_frames = {
+            "stand": FrameSet(self.anim_stand, facing=-1),
+            "walk": FrameSet(self.anim_walk, facing=-1),
+        }
 
         self.player_anim_index = 0
-        self.player_timer = pygame.time.get_ticks()
+        self.player_timer = self.now
         self.player_anim_speed = 150
         self.player_state = "stand"  # stand | walk
         self.player_dir = 1  # 1 = phải, -1 = trái
 
         self.player_x = self.WIDTH // 2
         self.player_y = self.ground_rect.top + 75
+        self.prev_player_x, self.prev_player_y = self.player_x, self.player_y
         self.vel_y = 0
         self.on_ground = True
         self.speed = 4
@@ -189,30 +131,52 @@ class Level2:
         self.invincible_timer = 0
         self.flash = False
 
-        # buffalo
+        # đàn trâu
         npc_dir = os.path.join(base_dir, "buffalo")
-        self.buffalo = Buffalo(npc_dir, self.ground_rect.top + 80, self.WIDTH)
-        while abs(self.buffalo.x - self.player_x) < 300:
-            self.buffalo.x = random.randint(100, self.WIDTH - 200)
+        self.herd = Herd(load_buffalo_frames(npc_dir), herd_size or self.HERD_SIZE,
+                         self.ground_rect.top + 80, self.world_width, self.rng, avoid_x=self.player_x)
+        # bụi tung sau chân những con đang lao tới
+        self.dust = particles.dust()
+        self.emitters = [self.dust]
+        # collision world: trâu là lớp HAZARD
+        self.colliders = collision.CollisionWorld()
+        self.sync_herd()
+
+        # camera + chunk: trâu ở chunk xa camera đứng yên
+        self.camera = Camera(self.WIDTH, self.world_width, self.player_x - self.WIDTH / 2)
+        self.streamer = ChunkStreamer(self.world_width, self.WIDTH)
+        self.streamer.update(self.camera.x, self.WIDTH)
+
+        # parallax: cảnh nền cuộn chậm, đất cuộn cùng world
+        self.parallax = Parallax(self.WIDTH)
+        self.parallax.add(self.background, 0, 0.3)
+        self.parallax.add(self.ground, self.ground_rect.top, 1.0)
+        self.static_x = None  # vị trí camera lúc ghép lớp nền gần nhất
+
+        # renderer: lớp nền ghép từ parallax, chỉ ghép lại khi camera cuộn
+        self.renderer = make_renderer(screen, dirty)
+        # lệnh vẽ của từng frame gom lại, sắp theo z rồi vẽ một lần
+        self.queue = RenderQueue()
 
     def handle_input(self):
-        keys = pygame.key.get_pressed()
+        actions = self.actions
         moving = False
 
-        if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+        if actions & controls.LEFT:
             self.player_x -= self.speed
             self.player_dir = -1
             moving = True
-        if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+        if actions & controls.RIGHT:
             self.player_x += self.speed
             self.player_dir = 1
             moving = True
-        if (keys[pygame.K_UP] or keys[pygame.K_SPACE]) and self.on_ground:
+        if actions & controls.JUMP and self.on_ground:
             self.vel_y = -self.jump_strength
+            audio.play("jump")
             self.on_ground = False
 
         self.player_state = "walk" if moving else "stand"
-        self.player_x = max(50, min(self.player_x, self.WIDTH - 50))
+        self.player_x = max(50, min(self.player_x, self.world_width - 50))
 
     def apply_physics(self):
         self.vel_y += self.gravity
@@ -225,71 +189,168 @@ class Level2:
         else:
             self.on_ground = False
 
-    def get_current_player_image(self):
-        now = pygame.time.get_ticks()
-        anims = self.anim_walk if self.player_state == "walk" else self.anim_stand
+    def update_animation(self):
+        now = self.now
+        anims = self.player_frames[self.player_state]
 
         # đảm bảo chỉ số luôn hợp lệ
         if self.player_anim_index >= len(anims):
             self.player_anim_index = 0
 
-        # cập nhật hoạt ảnh theo thời gian
+        # cập nhật hoạt ảnh theo thời gian mô phỏng
         if now - self.player_timer >= self.player_anim_speed:
             self.player_anim_index = (self.player_anim_index + 1) % len(anims)
             self.player_timer = now
 
-        img = anims[self.player_anim_index]
-        if self.player_dir == 1:
-            img = pygame.transform.flip(img, True, False)
-        return img
+    def get_current_player_image(self):
+        return self.player_frames[self.player_state].image(self.player_dir, self.player_anim_index)
+
+    def get_current_player_mask(self):
+        return self.player_frames[self.player_state].mask(self.player_dir, self.player_anim_index)
 
 
-    def run(self):
-        while self.running:
-            for e in pygame.event.get():
-                if e.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+    # Update: một bước mô phỏng cố định
+    def update(self):
+        self.now += self.timestep.step_ms
+        self.prev_player_x, self.prev_player_y = self.player_x, self.player_y
+        if self.transition is not None:
+            self.transition.update(self.timestep.step_ms)
+            if self.transition.done:
+                self.transition = None
 
+        with profiler.phase("input"):
+            self.actions = self.controls.poll(self.tick)
+            self.tick += 1
             self.handle_input()
+        with profiler.phase("physics"):
             self.apply_physics()
-
+        with profiler.phase("animation"):
+            self.update_animation()
+
+        player_img = self.get_current_player_image()
+        player_rect = player_img.get_rect(midbottom=(self.player_x, self.player_y))
+
+        with profiler.phase("stream"):
+            self.camera.follow(self.player_x)
+            self.streamer.update(self.camera.x, self.WIDTH)
+
+        with profiler.phase("npc"):
+            self.herd.update(player_rect, self.now, self.active_herd())
+            self.sync_herd()
+            if len(self.herd.new_charges):
+                audio.play("charge")
+
+        with profiler.phase("collision"):
+            # chỉ các con ở ô lưới gần player mới được lọc rect rồi so mask pixel-perfect
+            hits = self.colliders.overlap(player_rect, self.get_current_player_mask(), collision.HAZARD)
+            hit = min(hits)[1] if hits else None
+
+        if hit is not None and not self.invincible:
+            self.invincible = True
+            self.invincible_timer = self.now
+            self.vel_y = -12
+            self.herd.stun(hit, self.now)
+            audio.play("hit")
+
+        with profiler.phase("particles"):
+            self.kick_dust()
+            for emitter in self.emitters:
+                emitter.update(self.timestep.step_ms)
+
+        # invincible nhấp nháy
+        if self.invincible:
+            now = self.now
+            if now - self.invincible_timer >= 2000:
+                self.invincible = False
+            else:
+                self.flash = (now // 100) % 2 == 0
+
+    def kick_dust(self):
+        """Một đám bụi sau chân mỗi con vừa bắt đầu lao tới"""
+        herd = self.herd
+        for i in herd.new_charges.tolist():
+            direction = int(herd.direction[i])
+            self.dust.emit(24, herd.x[i] - direction * herd.width / 3, herd.ground_y - 8,
+                           speed=(1.0, 4.0), angle=particles.spray_angles(direction),
+                           life=(500.0, 1000.0), spread=10)
+
+    # chunk streaming
+    def active_herd(self):
+        """Mask các con trâu thuộc chunk đang nạp (None = cả đàn)"""
+        left, right = self.streamer.span()
+        if left <= 0 and right >= self.world_width:
+            return None
+        return (self.herd.x >= left) & (self.herd.x < right)
+
+    def sync_herd(self):
+        herd = self.herd
+        self.colliders.sync_group("herd", herd, herd.x - herd.width / 2, herd.ground_y - herd.height,
+                              herd.width, herd.height, collision.HAZARD)
+
+    def snapshot(self) -> dict:
+        """Trạng thái mô phỏng dạng dict thuần, dùng để so sánh khi chạy headless"""
+        return {
+            "tick": self.tick,
+            "player": (self.player_x, self.player_y, self.vel_y),
+            "invincible": self.invincible,
+            "buffalo": self.herd.describe(0),
+            "herd": dict(zip(STATE_NAMES, self.herd.counts())),
+        }
+
+    def step(self, n=1):
+        """Chạy n bước mô phỏng, không vẽ (dùng để tua nhanh)"""
+        for _ in range(n):
+            self.update()
+
+    # Draw: nội suy vị trí giữa hai bước
+    def draw(self, alpha=1.0):
+        with profiler.phase("blit"):
+            self.draw_world(alpha)
+            if self.transition is not None:
+                self.transition.draw(self.renderer)
+            profiler.draw_overlay(self.renderer)
+        with profiler.phase("present"):
+            self.renderer.present()
+
+    def draw_world(self, alpha):
+        cam = self.camera.offset(alpha)
+        if cam != self.static_x or self.renderer.static is None:
+            # camera cuộn → ghép lại nền từ các dải parallax (≤ 2 blit mỗi lớp)
+            self.renderer.set_static(self.parallax.blits(cam))
+            self.static_x = cam
+        self.renderer.begin()
+        queue = self.queue
+        # cả đàn (đã bỏ những con ngoài camera) vào hàng đợi một lần; cùng đứng trên
+        # một dải đất nên gộp chung một vùng dirty là vừa
+        queue.extend(Z_WORLD, self.herd.blits(alpha, cam, self.WIDTH))
+        for emitter in self.emitters:
+            queue.extend(Z_EFFECTS, emitter.blits(alpha, cam, self.WIDTH))
+        if not (self.invincible and self.flash):
+            pos = (lerp(self.prev_player_x, self.player_x, alpha) - cam,
+                   lerp(self.prev_player_y, self.player_y, alpha))
             player_img = self.get_current_player_image()
-            player_rect = player_img.get_rect(midbottom=(self.player_x, self.player_y))
-
-            self.buffalo.update(player_rect)
-
-            buffalo_rect, buffalo_mask = self.buffalo.draw(self.screen)
-
-# --- va chạm pixel-perfect ---
-            player_mask = pygame.mask.from_surface(player_img)
-            offset = (buffalo_rect.x - player_rect.x, buffalo_rect.y - player_rect.y)
-            collision = player_mask.overlap(buffalo_mask, offset)
-
-            if collision and not self.invincible:
-                self.invincible = True
-                self.invincible_timer = pygame.time.get_ticks()
-                self.vel_y = -12
-                self.buffalo.state = "cooldown"
-                self.buffalo.cooldown_timer = pygame.time.get_ticks()
-
-
-            # invincible nhấp nháy
-            if self.invincible:
-                now = pygame.time.get_ticks()
-                if now - self.invincible_timer >= 2000:
-                    self.invincible = False
-                else:
-                    self.flash = (now // 100) % 2 == 0
-
-            # render
-            self.screen.blit(self.background, (0, 0))
-            self.screen.blit(self.ground, self.ground_rect.topleft)
-            self.buffalo.draw(self.screen)
-            if not (self.invincible and self.flash):
-                self.screen.blit(player_img, player_rect)
-
-            pygame.display.flip()
-            self.clock.tick(60)
-
-    
\ No newline at end of file
+            queue.add(Z_PLAYER, player_img, player_img.get_rect(midbottom=pos))
+        queue.flush(self.renderer)
+
+    # Scene: ESC quay lại màn trước, level được giữ nguyên để chơi tiếp
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE and self.manager:
+            self.manager.pop()
+
+    def enter(self):
+        # scene khác vừa vẽ đè lên màn hình → frame đầu vẽ lại toàn bộ
+        self.renderer.invalidate()
+
+    def release(self):
+        self.renderer.static = None
+        self.streamer.clear()
+        # streamer.clear() bỏ chunk khi chúng vẫn còn trong resident → gỡ hết collider ở đây
+        self.colliders.clear()
+
+    def run(self, transition=None):
+        """Chạy level như một stack riêng (khi không đi qua game.py)"""
+        # transition (vd. Fade) chạy ngay trong vòng lặp frame của level
+        self.transition = transition
+        if not SceneStack(self).run():
+            pygame.quit()
+            sys.exit()
@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import sys
+import weakref
+from collections import deque
+
+# Chạy không cần màn hình như headless.py (đặt trước khi init pygame)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from assets import assets, scale_cache, surface_bytes
+from text import text_renderer
+
+# object thuộc các module này thì đi sâu vào thuộc tính để tìm surface / mask
+GAME_MODULES = {"level1", "level2", "sprites", "parallax", "render", "herd", "collision",
+                "world", "transitions", "controls", "timestep"}
+# thuộc tính không thuộc về scene (stack đang chứa nó, màn hình dùng chung)
+SKIP_ATTRS = {"manager", "screen"}
+
+
+def mask_bytes(mask) -> int:
+    # bitmask của pygame: mỗi hàng làm tròn lên bội 64 bit
+    width, height = mask.get_size()
+    return (width + 63) // 64 * 8 * height
+
+
+# ----------------- Đếm bộ nhớ theo scene -----------------
+class MemoryReport:
+    """Bytes của surface và mask mà một scene giữ, gom theo thuộc tính
+
+    Mỗi surface / mask chỉ đếm một lần trong một báo cáo; subsurface được
+    tính vào surface cha (vd. cả ảnh atlas). Các scene khác nhau có thể
+    cùng giữ một surface nên tổng các báo cáo có thể lớn hơn RAM thật.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.groups = {}
+        self._seen = set()
+        display = pygame.display.get_surface()
+        if display is not None:
+            self._seen.add(id(display))
+
+    def add(self, group, obj):
+        self.groups.setdefault(group, {"surfaces": 0, "masks": 0, "surface_count": 0, "mask_count": 0})
+        self._walk(group, obj)
+
+    def add_scene(self, scene):
+        for name, value in vars(scene).items():
+            if name not in SKIP_ATTRS:
+                self.add(name, value)
+
+    @property
+    def surfaces(self) -> int:
+        return sum(g["surfaces"] for g in self.groups.values())
+
+    @property
+    def masks(self) -> int:
+        return sum(g["masks"] for g in self.groups.values())
+
+    def to_dict(self) -> dict:
+        groups = {name: g for name, g in self.groups.items() if g["surface_count"] or g["mask_count"]}
+        return {"surfaces": self.surfaces, "masks": self.masks, "groups": groups}
+
+    def _walk(self, group, obj):
+        if id(obj) in self._seen:
+            return
+        self._seen.add(id(obj))
+        stats = self.groups[group]
+        if isinstance(obj, pygame.Surface):
+            parent = obj.get_abs_parent()
+            if parent is not obj:
+                self._walk(group, parent)
+            else:
+                stats["surfaces"] += surface_bytes(obj)
+                stats["surface_count"] += 1
+        elif isinstance(obj, pygame.mask.Mask):
+            stats["masks"] += mask_bytes(obj)
+            stats["mask_count"] += 1
+        elif isinstance(obj, (weakref.WeakKeyDictionary, weakref.WeakValueDictionary)):
+            return
+        elif isinstance(obj, dict):
+            for key, value in obj.items():
+                self._walk(group, key)
+                self._walk(group, value)
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            for value in obj:
+                self._walk(group, value)
+        elif type(obj).__module__ in GAME_MODULES:
+            attrs = dict(vars(obj)) if hasattr(obj, "__dict__") else {}
+            for name in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, name):
+                    attrs[name] = getattr(obj, name)
+            for name, value in attrs.items():
+                if name not in SKIP_ATTRS:
+                    self._walk(group, value)
+
+
+# ----------------- Dựng từng scene -----------------
+def report_menu(size) -> MemoryReport:
+    import game
+    from bench import MENU_SCENES
+    game.init(size)
+    # vẽ qua mọi state để cache scale / chữ đầy như khi chơi thật
+    for state, values in MENU_SCENES.items():
+        for name, value in dict(values, state=state).items():
+            setattr(game, name, value)
+        game.draw_state()
+    report = MemoryReport("menu")
+    report.add("background", game.background_surface)
+    report.add("play_button", game.play_surface_original)
+    report.add("images", [game.load_image(path) for path in [game.welcome_bg_path] + game.chapter_paths])
+    report.add("scale_cache", scale_cache.surfaces())
+    report.add("text", text_renderer.surfaces())
+    return report
+
+
+def report_level(name, screen) -> MemoryReport:
+    from headless import LEVELS
+    level = LEVELS[name](screen)
+    # một bước + một frame để renderer dựng lớp nền
+    level.step(1)
+    level.draw(1.0)
+    from atlas import atlas
+    report = MemoryReport(type(level).__name__)
+    # ảnh atlas dùng chung cho mọi level, tách riêng để không tính vào nhóm sprite đầu tiên
+    report.add("atlas", atlas.sheet())
+    report.add_scene(level)
+    level.release()
+    return report
+
+
+def print_report(report):
+    mb = 1024 * 1024
+    print(f"{report.name:24s} surfaces {report.surfaces / mb:8.2f} MB   masks {report.masks / mb:8.3f} MB")
+    groups = sorted(report.groups.items(), key=lambda item: -(item[1]["surfaces"] + item[1]["masks"]))
+    for group, g in groups:
+        if g["surface_count"] or g["mask_count"]:
+            print(f"  {group:22s} {g['surfaces'] / mb:8.2f} MB ({g['surface_count']:3d} surface)"
+                  f"  {g['masks'] / 1024:8.1f} KB ({g['mask_count']:3d} mask)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Báo cáo bộ nhớ surface / mask của từng scene")
+    parser.add_argument("--scenes", nargs="+", choices=("menu", "level1", "level2"),
+                        default=["menu", "level1", "level2"])
+    parser.add_argument("--size", default="1280x720", help="độ phân giải logic, vd. 1920x1080")
+    parser.add_argument("--out", help="ghi kết quả ra file JSON")
+    args = parser.parse_args(argv)
+
+    size = tuple(int(v) for v in args.size.split("x"))
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode(size)
+
+    results = {}
+    for name in args.scenes:
+        report = report_menu(size) if name == "menu" else report_level(name, screen)
+        print_report(report)
+        results[name] = report.to_dict()
+    stats = assets.stats()
+    print(f"{'asset cache':24s} {stats['used_bytes'] / 1024 / 1024:8.2f} MB "
+          f"/ ngân sách {stats['budget_bytes'] / 1024 / 1024:.0f} MB ({stats['entries']} ảnh)")
+    results["asset_cache"] = stats
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"size": list(size), "scenes": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
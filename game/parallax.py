@@ -0,0 +1,59 @@
+import math
+
+import pygame
+
+
+# ----------------- Lớp parallax -----------------
+class ParallaxLayer:
+    """Một lớp cuộn theo camera với tỉ lệ `rate` (0 = đứng yên, 1 = đi cùng world)
+
+    Ảnh được lặp sẵn thành một dải rộng ít nhất bằng màn hình, nên mỗi
+    frame chỉ cần tối đa hai lần blit (đoạn cuối dải + đoạn đầu quấn lại),
+    không phải scale gì cả.
+    """
+
+    def __init__(self, surface, y, rate, view_width):
+        self.y = y
+        self.rate = rate
+        tile_w, tile_h = surface.get_size()
+        repeats = max(1, math.ceil(view_width / tile_w))
+        if repeats == 1:
+            # ảnh đã rộng bằng màn hình: dùng luôn, khỏi giữ thêm một bản sao
+            self.strip = surface
+            return
+        flags = pygame.SRCALPHA if surface.get_flags() & pygame.SRCALPHA else 0
+        self.strip = pygame.Surface((tile_w * repeats, tile_h), flags)
+        if pygame.display.get_surface() is not None:
+            self.strip = self.strip.convert_alpha() if flags else self.strip.convert()
+        for i in range(repeats):
+            self.strip.blit(surface, (i * tile_w, 0))
+
+    def blits(self, camera_x, view_width) -> list:
+        """Danh sách (surface, vị trí, vùng) để vẽ lớp này ở camera_x"""
+        width, height = self.strip.get_size()
+        start = int(camera_x * self.rate) % width
+        first = min(width - start, view_width)
+        parts = [(self.strip, (0, self.y), pygame.Rect(start, 0, first, height))]
+        if first < view_width:
+            parts.append((self.strip, (first, self.y), pygame.Rect(0, 0, view_width - first, height)))
+        return parts
+
+
+# ----------------- Nền nhiều lớp -----------------
+class Parallax:
+    """Các lớp nền (trời / đồi / đất...) vẽ từ xa tới gần"""
+
+    def __init__(self, view_width):
+        self.view_width = view_width
+        self.layers = []
+
+    def add(self, surface, y, rate) -> ParallaxLayer:
+        layer = ParallaxLayer(surface, y, rate, self.view_width)
+        self.layers.append(layer)
+        return layer
+
+    def blits(self, camera_x) -> list:
+        parts = []
+        for layer in self.layers:
+            parts.extend(layer.blits(camera_x, self.view_width))
+        return parts
@@ -0,0 +1,142 @@
+import math
+
+import numpy as np
+import pygame
+
+from assets import rle_sprite
+from timestep import STEP_MS
+
+
+# ----------------- Ảnh hạt -----------------
+def dot_frames(color, radius, stages=6, grow=1.0, start_alpha=255) -> list:
+    """Các ảnh chấm tròn theo tuổi hạt: to dần (grow) và mờ dần về 0"""
+    frames = []
+    for i in range(stages):
+        t = i / max(1, stages - 1)
+        r = max(1, int(round(radius * (1 + (grow - 1) * t))))
+        surf = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+        pygame.draw.circle(surf, (*color[:3], int(start_alpha * (1 - t * 0.85))), (r, r), r)
+        # hàng nghìn hạt dùng chung vài ảnh → bản RLE blit nhanh hơn
+        frames.append(rle_sprite(surf))
+    return frames
+
+
+# ----------------- Emitter -----------------
+class Emitter:
+    """Một loại hạt (bụi / tia lửa...) lưu trong mảng NumPy cấp sẵn `capacity` chỗ
+
+    emit() chỉ lấp vào các chỗ đã chết, đầy thì bỏ bớt hạt mới chứ không
+    cấp phát thêm. Mỗi bước cập nhật cả mảng một lượt; vẽ bằng đúng một
+    lần `blits` cho cả emitter, bỏ qua hạt ngoài vùng nhìn thấy.
+    `screen_space` = toạ độ màn hình (không trừ camera), dùng cho hiệu
+    ứng gắn với giao diện.
+    """
+
+    def __init__(self, frames, capacity=512, gravity=0.0, drag=1.0, screen_space=False, seed=0):
+        self.frames = frames
+        self.capacity = capacity
+        self.gravity = gravity
+        self.drag = drag
+        self.screen_space = screen_space
+        # rng riêng: hạt chỉ để nhìn, không được lấy số từ rng của level (replay phải y hệt)
+        self.rng = np.random.default_rng(seed)
+
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.prev_x = np.zeros(capacity)
+        self.prev_y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.age = np.zeros(capacity)
+        self.life = np.ones(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.live = 0
+        # nửa kích thước từng ảnh để vẽ hạt căn giữa
+        self.half_w = np.array([f.get_width() / 2 for f in frames])
+        self.half_h = np.array([f.get_height() / 2 for f in frames])
+        # mảng object để lấy ảnh theo stage bằng một lần index thay vì vòng lặp Python
+        self._frames = np.empty(len(frames), dtype=object)
+        self._frames[:] = frames
+
+    def emit(self, count, x, y, speed=(1.0, 4.0), angle=(0.0, 360.0), life=(300.0, 600.0), spread=0.0) -> int:
+        """Sinh tối đa count hạt tại (x, y); góc tính theo độ, 90 = thẳng lên"""
+        free = np.flatnonzero(~self.alive)[:count]
+        n = len(free)
+        if not n:
+            return 0
+        rng = self.rng
+        theta = np.radians(rng.uniform(angle[0], angle[1], n))
+        v = rng.uniform(speed[0], speed[1], n)
+        self.x[free] = self.prev_x[free] = x + rng.uniform(-spread, spread, n)
+        self.y[free] = self.prev_y[free] = y + rng.uniform(-spread, spread, n)
+        self.vx[free] = np.cos(theta) * v
+        self.vy[free] = -np.sin(theta) * v
+        self.age[free] = 0.0
+        self.life[free] = rng.uniform(life[0], life[1], n)
+        self.alive[free] = True
+        self.live += n
+        return n
+
+    def update(self, dt_ms=STEP_MS):
+        if not self.live:
+            return
+        # cập nhật cả mảng (chỗ chết cũng chạy, rẻ hơn lọc theo mask)
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+        self.vy += self.gravity
+        if self.drag != 1.0:
+            self.vx *= self.drag
+            self.vy *= self.drag
+        self.x += self.vx
+        self.y += self.vy
+        self.age += dt_ms
+        self.alive &= self.age < self.life
+        self.live = int(np.count_nonzero(self.alive))
+
+    def clear(self):
+        self.alive[:] = False
+        self.live = 0
+
+    def blits(self, alpha=1.0, camera_x=0, view_width=None) -> list:
+        """Danh sách (surface, vị trí) của các hạt còn sống trong màn hình, để vẽ một lần bằng blits"""
+        if not self.live:
+            return []
+        idx = np.flatnonzero(self.alive)
+        stage = np.minimum((self.age[idx] / self.life[idx] * len(self.frames)).astype(np.intp), len(self.frames) - 1)
+        prev_x, prev_y = self.prev_x[idx], self.prev_y[idx]
+        xs = prev_x + (self.x[idx] - prev_x) * alpha - self.half_w[stage]
+        ys = prev_y + (self.y[idx] - prev_y) * alpha - self.half_h[stage]
+        if not self.screen_space:
+            xs -= camera_x
+        if view_width is not None:
+            shown = (xs > -2 * self.half_w[stage]) & (xs < view_width)
+            stage, xs, ys = stage[shown], xs[shown], ys[shown]
+        return list(zip(self._frames[stage].tolist(), zip(xs.tolist(), ys.tolist())))
+
+    def draw(self, dest, alpha=1.0, camera_x=0, view_width=None):
+        dest.blits(self.blits(alpha, camera_x, view_width))
+
+
+# ----------------- Các hiệu ứng dùng trong level -----------------
+def dust(capacity=512) -> Emitter:
+    """Bụi tung lên sau chân trâu khi lao tới"""
+    return Emitter(dot_frames((150, 125, 95), 6, stages=6, grow=2.2, start_alpha=170),
+                   capacity, gravity=-0.02, drag=0.93, seed=1)
+
+
+def sparks(capacity=256) -> Emitter:
+    """Tia lửa khi nhặt đá"""
+    return Emitter(dot_frames((255, 230, 120), 2, stages=4), capacity, gravity=0.25, drag=0.97, seed=2)
+
+
+def burst(capacity=512) -> Emitter:
+    """Chùm sáng khi rìu tay hiện ra (toạ độ màn hình)"""
+    return Emitter(dot_frames((255, 215, 60), 4, stages=6, grow=0.5), capacity,
+                   gravity=0.05, drag=0.96, screen_space=True, seed=3)
+
+
+def spray_angles(direction, width=70.0):
+    """Khoảng góc phun chếch lên, ngược chiều direction (1 = đang chạy sang phải)"""
+    back = 180.0 if direction > 0 else 0.0
+    up = math.copysign(1.0, direction)
+    return tuple(sorted((back - up * 10.0, back - up * (10.0 + width))))
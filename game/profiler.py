@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import pygame
+
+# ----------------- Cấu hình -----------------
+# CULVER_PROFILE=1 bật ngay từ đầu, CULVER_PROFILE_OUT=file.csv|file.json để ghi ra file
+PROFILE_DEFAULT = os.environ.get("CULVER_PROFILE", "0") == "1"
+PROFILE_OUT = os.environ.get("CULVER_PROFILE_OUT")
+HOTKEY = pygame.K_F3
+
+# Thứ tự cột khi xuất CSV / hiển thị overlay
+PHASES = ("events", "input", "physics", "animation", "stream", "npc", "collision", "particles", "update", "blit", "draw", "present")
+# Bộ đếm theo frame (không phải thời gian): số lệnh vẽ, % màn hình phải cập nhật
+COUNTERS = ("draw_calls", "redraw_pct")
+
+_NULL_PHASE = nullcontext()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        current = self.profiler.current
+        current[self.name] = current.get(self.name, 0.0) + (time.perf_counter() - self.start) * 1000.0
+
+
+# ----------------- Profiler theo phase -----------------
+class Profiler:
+    """Đo thời gian từng phase trong frame (input, physics, blit, present...)
+
+    Khi tắt, `phase()` trả về một context rỗng dùng chung nên gần như
+    không tốn gì. F3 bật/tắt overlay; dữ liệu từng frame được ghi liên
+    tục ra CSV hoặc JSON lines nếu có đường dẫn xuất.
+    """
+
+    def __init__(self, enabled=PROFILE_DEFAULT, window=120, export_path=PROFILE_OUT):
+        self.enabled = enabled
+        self.window = window
+        self.export_path = export_path
+        self.frames = 0
+        self.current = {}
+        self.history = deque(maxlen=window)
+        self._last_frame = None
+        self._writer = None
+        self._file = None
+        self._font = None
+        self._overlay = None
+        self._overlay_time = 0.0
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def count(self, name, value):
+        """Ghi một bộ đếm của frame hiện tại (cộng dồn nếu gọi nhiều lần)"""
+        if self.enabled:
+            self.current[name] = self.current.get(name, 0) + value
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.current = {}
+        self.history.clear()
+        self._last_frame = None
+
+    def handle_event(self, event) -> bool:
+        if event.type == pygame.KEYDOWN and event.key == HOTKEY:
+            self.toggle()
+            return True
+        return False
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        frame_ms = (now - self._last_frame) * 1000.0 if self._last_frame is not None else 0.0
+        self._last_frame = now
+        record = dict(self.current, frame=frame_ms)
+        self.history.append(record)
+        self.current = {}
+        self.frames += 1
+        if self.export_path:
+            self._export(record)
+
+    def fps(self) -> float:
+        frames = [r["frame"] for r in self.history if r["frame"] > 0]
+        return 1000.0 * len(frames) / sum(frames) if frames else 0.0
+
+    def averages(self) -> dict:
+        totals = {}
+        for record in self.history:
+            for name, ms in record.items():
+                totals[name] = totals.get(name, 0.0) + ms
+        count = len(self.history) or 1
+        return {name: total / count for name, total in totals.items()}
+
+    # ---- overlay ----
+    def draw_overlay(self, dest, pos=(8, 8)):
+        """Vẽ bảng thời gian lên dest (screen hoặc renderer có .blit)"""
+        if not self.enabled:
+            return
+        # chỉ render lại chữ 4 lần/giây, các frame khác blit surface cũ
+        now = time.perf_counter()
+        if self._overlay is None or now - self._overlay_time >= 0.25:
+            self._overlay = self._build_overlay()
+            self._overlay_time = now
+        dest.blit(self._overlay, pos)
+
+    def _build_overlay(self):
+        if self._font is None:
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+            self._font = pygame.font.Font(os.path.join(base_dir, "font", "DejaVuSans.ttf"), 14)
+        averages = self.averages()
+        lines = [f"FPS {self.fps():5.1f}   frame {averages.get('frame', 0.0):6.2f} ms"]
+        for name in PHASES:
+            if name in averages:
+                lines.append(f"{name:<10s} {averages[name]:6.2f} ms")
+        for name in COUNTERS:
+            if name in averages:
+                lines.append(f"{name:<10s} {averages[name]:6.1f}")
+        line_h = self._font.get_linesize()
+        width = max(self._font.size(line)[0] for line in lines) + 12
+        panel = pygame.Surface((width, line_h * len(lines) + 8), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for i, line in enumerate(lines):
+            panel.blit(self._font.render(line, True, (255, 255, 255)), (6, 4 + i * line_h))
+        return panel
+
+    # ---- xuất file ----
+    def _export(self, record):
+        if self._file is None:
+            self._file = open(self.export_path, "w", newline="", encoding="utf-8")
+            if not self.export_path.endswith(".json"):
+                self._writer = csv.writer(self._file)
+                self._writer.writerow(("frame_no", "frame_ms") + PHASES + COUNTERS)
+        if self._writer is not None:
+            self._writer.writerow([self.frames, f"{record['frame']:.3f}"] +
+                                  [f"{record.get(name, 0.0):.3f}" for name in PHASES] +
+                                  [record.get(name, 0) for name in COUNTERS])
+        else:
+            self._file.write(json.dumps(dict(record, frame_no=self.frames)) + "\n")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+profiler = Profiler()
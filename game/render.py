@@ -0,0 +1,430 @@
+import os
+import weakref
+from operator import itemgetter
+
+import pygame
+
+from assets import scale_cache
+from profiler import profiler
+
+# Bật chế độ dirty-rect mặc định bằng biến môi trường CULVER_DIRTY_RECTS=1
+DIRTY_RECTS_DEFAULT = os.environ.get("CULVER_DIRTY_RECTS", "0") == "1"
+
+# Độ phân giải logic (CULVER_LOGICAL_SIZE=WxH): mọi scene vẽ ở kích thước này,
+# SDL tự scale ra cửa sổ thật (pygame.SCALED) nên đổi cỡ cửa sổ không phải dựng lại gì
+LOGICAL_SIZE = tuple(int(v) for v in os.environ.get("CULVER_LOGICAL_SIZE", "1280x720").split("x"))
+
+# Backend vẽ (CULVER_BACKEND): "surface" = blit phần mềm lên display surface như cũ,
+# "sdl2" = Renderer + Texture của pygame._sdl2.video (chạy được cả với renderer software)
+BACKENDS = ("surface", "sdl2")
+BACKEND = os.environ.get("CULVER_BACKEND", "surface")
+
+# Lớp vẽ (z) dùng chung cho các level, số nhỏ vẽ trước; giữ đúng thứ tự vẽ cũ:
+# thế giới (đá, mũi tên, chữ gợi ý, phần thưởng, đàn trâu) → hạt → player trên cùng
+Z_WORLD, Z_EFFECTS, Z_PLAYER = 10, 20, 30
+
+
+# ----------------- Cửa sổ -----------------
+def open_window(size=LOGICAL_SIZE, fullscreen=False, backend=None, title=None):
+    """Mở cửa sổ co giãn được; kết quả (Surface hoặc TextureScreen) luôn có kích thước logic `size`"""
+    if (backend or BACKEND) == "sdl2":
+        return TextureScreen(size, fullscreen, title or "pygame")
+    if title:
+        pygame.display.set_caption(title)
+    flags = pygame.FULLSCREEN if fullscreen else 0
+    if pygame.display.get_driver() == "dummy":
+        # chạy headless (bench / CI) không có gì để scale, mà SDL dummy mở lại
+        # cửa sổ SCALED nhiều lần thì hỏng renderer
+        return pygame.display.set_mode(size, flags)
+    try:
+        return pygame.display.set_mode(size, flags | pygame.SCALED | pygame.RESIZABLE)
+    except pygame.error:
+        # không tạo được renderer → cửa sổ thường, vẫn đúng kích thước logic
+        return pygame.display.set_mode(size, flags)
+
+
+def toggle_fullscreen(screen):
+    """Bật/tắt toàn màn hình, giữ nguyên kích thước logic"""
+    if isinstance(screen, TextureScreen):
+        screen.toggle_fullscreen()
+        return screen
+    try:
+        pygame.display.toggle_fullscreen()
+        return pygame.display.get_surface()
+    except pygame.error:
+        return open_window(screen.get_size(), not screen.get_flags() & pygame.FULLSCREEN)
+
+
+def present(screen):
+    """Đưa frame đã vẽ ra cửa sổ, với backend nào cũng vậy"""
+    if isinstance(screen, TextureScreen):
+        screen.present()
+    else:
+        pygame.display.flip()
+
+
+def blit_scaled(dest, surf, rect, smooth=False) -> pygame.Rect:
+    """Vẽ surf co giãn vào rect: backend sdl2 scale nearest ngay lúc vẽ, còn lại (và smooth) dùng scale_cache"""
+    rect = pygame.Rect(rect)
+    if isinstance(dest, TextureScreen):
+        return dest.draw_scaled(surf, rect, smooth)
+    return dest.blit(scale_cache.get(surf, rect.size, smooth=smooth), rect)
+
+
+def mouse_pos():
+    """Vị trí chuột trong toạ độ logic"""
+    if _active_screen is not None:
+        return _active_screen.window_to_logical(pygame.mouse.get_pos())
+    # pygame.SCALED đã tự đổi sang toạ độ logic
+    return pygame.mouse.get_pos()
+
+
+def make_renderer(screen, dirty=None):
+    """Renderer cho level theo backend của screen"""
+    if isinstance(screen, TextureScreen):
+        return TextureRenderer(screen)
+    return DirtyRenderer(screen, dirty)
+
+
+# ----------------- Ảnh lật -----------------
+# ảnh lật → (ảnh gốc, lật ngang, lật dọc); backend sdl2 vẽ texture của ảnh gốc kèm cờ lật
+_mirrors = weakref.WeakKeyDictionary()
+
+
+def mirrored(surf, flip_x=True, flip_y=False) -> pygame.Surface:
+    """Như pygame.transform.flip nhưng nhớ ảnh gốc để không phải upload thêm texture"""
+    flipped = pygame.transform.flip(surf, flip_x, flip_y)
+    _mirrors[flipped] = (surf, flip_x, flip_y)
+    return flipped
+
+
+# ----------------- Backend SDL2 (Renderer + Texture) -----------------
+_active_screen = None
+
+
+class TextureScreen:
+    """Màn hình vẽ bằng pygame._sdl2.video, dùng thay display surface
+
+    Có các hàm giống Surface mà game dùng (blit / fill / get_size...), nên
+    menu, transition, profiler vẽ lên nó y như lên screen. Mỗi surface được
+    upload thành texture một lần rồi dùng lại; alpha, lật và scale đều do
+    renderer làm lúc vẽ. Sprite cắt từ atlas dùng chung texture của cả atlas.
+
+    Surface đã upload coi như không đổi pixel; surface nào bị vẽ đè sau đó
+    phải gọi refresh().
+    """
+
+    def __init__(self, size=LOGICAL_SIZE, fullscreen=False, title="pygame"):
+        global _active_screen
+        from pygame._sdl2 import video
+
+        self.size = tuple(size)
+        # SDL đọc kiểu scale từ hint lúc tạo texture: đặt một lần cho mọi texture (nearest
+        # như transform.scale); ảnh cần smooth đã được smoothscale sẵn qua scale_cache
+        os.environ["SDL_RENDER_SCALE_QUALITY"] = "nearest"
+        self.window = video.Window(title, size=self.size, resizable=True)
+        try:
+            self.renderer = video.Renderer(self.window, vsync=False)
+        except video.error:
+            # không có GPU (headless / CI) → renderer software của SDL
+            self.renderer = video.Renderer(self.window, accelerated=0)
+        self.renderer.logical_size = self.size
+        self.fullscreen = False
+        if fullscreen:
+            self.toggle_fullscreen()
+        self._texture_type = video.Texture
+        self._textures = weakref.WeakKeyDictionary()
+        self.uploads = 0
+        _active_screen = self
+
+    # ---- giống Surface ----
+    def get_size(self):
+        return self.size
+
+    def get_width(self):
+        return self.size[0]
+
+    def get_height(self):
+        return self.size[1]
+
+    def get_rect(self, **kwargs) -> pygame.Rect:
+        rect = pygame.Rect((0, 0), self.size)
+        for name, value in kwargs.items():
+            setattr(rect, name, value)
+        return rect
+
+    def blit(self, surf, dest, area=None) -> pygame.Rect:
+        if area is not None:
+            area = pygame.Rect(area).clip(surf.get_rect())
+        width, height = surf.get_size() if area is None else area.size
+        dest = pygame.Rect(dest[0], dest[1], width, height)
+        self._draw(surf, dest, area)
+        return dest.clip(pygame.Rect((0, 0), self.size))
+
+    def blits(self, seq, doreturn=True):
+        rects = [self.blit(*item) for item in seq]
+        return rects if doreturn else None
+
+    def draw_scaled(self, surf, rect, smooth=False) -> pygame.Rect:
+        rect = pygame.Rect(rect)
+        if smooth:
+            # texture chỉ scale nearest → smoothscale trên CPU (có cache) rồi vẽ 1:1
+            return self.blit(scale_cache.get(surf, rect.size, smooth=True), rect.topleft)
+        self._draw(surf, rect, None)
+        return rect
+
+    def fill(self, color, rect=None) -> pygame.Rect:
+        self.renderer.draw_color = pygame.Color(color)
+        if rect is None:
+            self.renderer.clear()
+            return self.get_rect()
+        rect = pygame.Rect(rect)
+        self.renderer.fill_rect(rect)
+        return rect
+
+    # ---- riêng của backend ----
+    def present(self):
+        self.renderer.present()
+
+    def refresh(self, surf):
+        """Bỏ texture cũ của surf (sau khi surf bị vẽ đè)"""
+        self._textures.pop(surf, None)
+
+    def read_pixels(self, surface):
+        """Chép frame vừa vẽ vào surface (vd. ảnh chụp cho Crossfade)"""
+        self.renderer.to_surface(surface)
+        self.refresh(surface)
+
+    def window_to_logical(self, pos):
+        scale_x, scale_y = self.renderer.scale
+        viewport = self.renderer.get_viewport()
+        return (int(pos[0] / scale_x) - viewport.x, int(pos[1] / scale_y) - viewport.y)
+
+    def toggle_fullscreen(self):
+        if self.fullscreen:
+            self.window.set_windowed()
+        else:
+            self.window.set_fullscreen(desktop=True)
+        self.fullscreen = not self.fullscreen
+
+    def texture(self, surf):
+        """Texture của surf (upload lần đầu), kèm vùng nguồn nếu surf là subsurface"""
+        offset = (0, 0)
+        parent = surf.get_abs_parent()
+        if parent is not surf:
+            offset = surf.get_abs_offset()
+        texture = self._textures.get(parent)
+        if texture is None:
+            texture = self._textures[parent] = self._texture_type.from_surface(self.renderer, parent)
+            self.uploads += 1
+        return texture, pygame.Rect(offset, surf.get_size())
+
+    def _draw(self, surf, dest, area):
+        flip_x = flip_y = False
+        mirror = _mirrors.get(surf)
+        if mirror is not None:
+            source, flip_x, flip_y = mirror
+        else:
+            source = surf
+        texture, src = self.texture(source)
+        if area is not None:
+            # vùng tính theo ảnh đã lật → đổi về ảnh gốc
+            x = src.width - area.right if flip_x else area.x
+            y = src.height - area.bottom if flip_y else area.y
+            src = pygame.Rect(src.x + x, src.y + y, area.width, area.height)
+        alpha = surf.get_alpha()
+        texture.alpha = 255 if alpha is None else alpha
+        # ảnh đục không đặt alpha thì khỏi blend
+        blend = alpha is not None or surf.get_flags() & pygame.SRCALPHA
+        texture.blend_mode = 1 if blend else 0
+        texture.draw(srcrect=src, dstrect=dest, flip_x=flip_x, flip_y=flip_y)
+
+
+class TextureRenderer:
+    """Cùng giao diện với DirtyRenderer cho backend sdl2
+
+    Lớp tĩnh không ghép sẵn thành một surface nữa: các dải parallax là
+    texture, mỗi frame vẽ lại thẳng từ GPU (hoặc renderer software) nên
+    không cần dirty-rect.
+    """
+
+    dirty = False
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.static = None
+        self.last_fraction = 1.0
+        self.frames = 0
+
+    def set_static(self, layers):
+        self.static = list(layers)
+
+    def invalidate(self):
+        pass
+
+    def begin(self):
+        for layer in self.static:
+            self.screen.blit(*layer)
+
+    def blit(self, surf, dest, area=None) -> pygame.Rect:
+        return self.screen.blit(surf, dest, area)
+
+    def blits(self, seq, groups=None):
+        self.screen.blits(seq, False)
+
+    def mark(self, rect):
+        pass
+
+    def present(self):
+        self.screen.present()
+        self.frames += 1
+        profiler.count("redraw_pct", 100.0)
+
+    @property
+    def mean_fraction(self) -> float:
+        return 1.0
+
+
+# ----------------- Hàng đợi vẽ theo frame -----------------
+class RenderQueue:
+    """Gom lệnh vẽ của một frame kèm lớp z, sắp xếp một lần rồi đẩy đi bằng một lần blits
+
+    Mỗi lệnh ghi rõ lớp z của nó: add() cho một sprite, extend() cho cả
+    danh sách (surface, vị trí[, vùng]) mà Herd / Emitter / Parallax dựng
+    sẵn. Cùng một lớp thì giữ đúng thứ tự gửi. `draw_calls` là số lệnh vẽ
+    của frame vừa flush.
+    """
+
+    def __init__(self):
+        self.draw_calls = 0
+        self._entries = []  # (z, [(surface, vị trí, vùng)...]), mỗi lần gửi là một nhóm
+
+    def add(self, z, surf, dest, area=None):
+        self._entries.append((z, ((surf, dest, area),)))
+
+    def extend(self, z, seq):
+        self._entries.append((z, seq))
+
+    def flush(self, renderer):
+        """Vẽ mọi lệnh đã gom theo thứ tự z lên renderer rồi xoá hàng đợi"""
+        self._entries.sort(key=itemgetter(0))
+        seq, groups = [], []
+        for _, part in self._entries:
+            seq.extend(part)
+            groups.append(len(part))
+        if seq:
+            renderer.blits(seq, groups)
+        self.draw_calls = len(seq)
+        self._entries.clear()
+        profiler.count("draw_calls", self.draw_calls)
+
+
+def merge_rects(rects):
+    """Gộp các rect chồng lên nhau để không cập nhật một vùng hai lần"""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        i = 0
+        while i < len(merged):
+            if merged[i].colliderect(rect):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
+
+
+# ----------------- Dirty-rect renderer -----------------
+class DirtyRenderer:
+    """Vẽ lớp tĩnh (nền + đất) một lần, mỗi frame chỉ cập nhật vùng thay đổi
+
+    Khi tắt (`dirty=False`) renderer vẽ lại toàn bộ lớp tĩnh và flip như cũ,
+    nên các level luôn có thể đi qua nó.
+    """
+
+    def __init__(self, screen, dirty=None):
+        self.screen = screen
+        self.dirty = DIRTY_RECTS_DEFAULT if dirty is None else dirty
+        self.static = None
+        self.last_fraction = 1.0
+        self.frames = 0
+        self._fraction_sum = 0.0
+        self._prev = []
+        self._current = []
+        self._full = True
+
+    def set_static(self, layers):
+        """Ghép sẵn các lớp (surface, vị trí[, vùng]) thành một surface nền
+
+        Surface nền được dùng lại nếu cùng kích thước (camera cuộn sẽ ghép lại
+        thường xuyên); các lớp phải phủ kín màn hình.
+        """
+        size = self.screen.get_size()
+        if self.static is None or self.static.get_size() != size:
+            self.static = pygame.Surface(size)
+            if pygame.display.get_surface() is not None:
+                self.static = self.static.convert()
+        for layer in layers:
+            self.static.blit(*layer)
+        self.invalidate()
+
+    def invalidate(self):
+        """Buộc frame kế tiếp vẽ lại và cập nhật toàn màn hình"""
+        self._full = True
+
+    def begin(self):
+        if not self.dirty or self._full:
+            self.screen.blit(self.static, (0, 0))
+        else:
+            for rect in self._prev:
+                self.screen.blit(self.static, rect, rect)
+
+    def blit(self, surf, dest, area=None) -> pygame.Rect:
+        rect = self.screen.blit(surf, dest, area)
+        if rect.width and rect.height:
+            self._current.append(rect)
+        return rect
+
+    def blits(self, seq, groups=None):
+        """Vẽ cả loạt (surface, vị trí[, vùng]) bằng một lần Surface.blits
+
+        `groups` là số phần tử của từng nhóm liên tiếp trong seq, mỗi nhóm
+        đánh dấu chung một vùng (None = cả loạt là một nhóm).
+        """
+        rects = self.screen.blits(seq)
+        start = 0
+        for count in (len(rects),) if groups is None else groups:
+            # bỏ rect rỗng (nằm ngoài màn hình) để vùng gộp không bị kéo rộng ra
+            shown = list(filter(None, rects[start:start + count]))
+            if shown:
+                self.mark(shown[0].unionall(shown))
+            start += count
+
+    def mark(self, rect):
+        rect = pygame.Rect(rect).clip(self.screen.get_rect())
+        if rect.width and rect.height:
+            self._current.append(rect)
+
+    def present(self):
+        screen_area = self.screen.get_width() * self.screen.get_height()
+        if not self.dirty or self._full:
+            pygame.display.flip()
+            fraction = 1.0
+            self._full = False
+        else:
+            # vùng của frame trước (cần xoá) + vùng của frame này (mới vẽ)
+            rects = merge_rects(self._prev + self._current)
+            pygame.display.update(rects)
+            fraction = min(1.0, sum(r.width * r.height for r in rects) / screen_area)
+
+        self._prev = self._current
+        self._current = []
+        self.last_fraction = fraction
+        self.frames += 1
+        self._fraction_sum += fraction
+        profiler.count("redraw_pct", fraction * 100.0)
+
+    @property
+    def mean_fraction(self) -> float:
+        return self._fraction_sum / self.frames if self.frames else 0.0
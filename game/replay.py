@@ -0,0 +1,178 @@
+import argparse
+import importlib
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+
+import pygame
+
+import controls
+from profiler import profiler
+
+# ----------------- Định dạng file -----------------
+# header | tên level | các đoạn (số tick, bitmask) lặp lại liên tiếp
+MAGIC = b"CULR"
+VERSION = 1
+HEADER = struct.Struct("<4sBQHHHHIIB")  # magic, version, seed, world_screens, herd_size, w, h, ticks, checksum, len(tên)
+RUN = struct.Struct("<HB")
+MAX_RUN = 0xFFFF
+
+
+def state_checksum(snapshot) -> int:
+    """CRC32 của snapshot level, để biết bản phát lại có ra đúng trạng thái không"""
+    return zlib.crc32(repr(snapshot).encode("utf-8"))
+
+
+class Recording:
+    """Seed + cấu hình level + bitmask input từng tick, đủ để chạy lại y hệt"""
+
+    def __init__(self, level, seed, world_screens=1, herd_size=0, size=(1280, 720), actions=None, checksum=0):
+        self.level = level  # "module.Class", vd. "level1.Level1"
+        self.seed = seed
+        self.world_screens = world_screens
+        self.herd_size = herd_size
+        self.size = tuple(size)
+        self.actions = bytearray() if actions is None else actions
+        self.checksum = checksum
+
+    @property
+    def ticks(self) -> int:
+        return len(self.actions)
+
+    @classmethod
+    def for_level(cls, level, seed) -> "Recording":
+        herd = getattr(level, "herd", None)
+        return cls(f"{type(level).__module__}.{type(level).__name__}", seed,
+                   world_screens=level.world_width // level.WIDTH,
+                   herd_size=len(herd) if herd is not None else 0,
+                   size=(level.WIDTH, level.HEIGHT))
+
+    def encode(self) -> bytes:
+        name = self.level.encode("utf-8")
+        parts = [HEADER.pack(MAGIC, VERSION, self.seed, self.world_screens, self.herd_size,
+                             self.size[0], self.size[1], self.ticks, self.checksum, len(name)), name]
+        i, actions = 0, self.actions
+        while i < len(actions):
+            j = i + 1
+            while j < len(actions) and j - i < MAX_RUN and actions[j] == actions[i]:
+                j += 1
+            parts.append(RUN.pack(j - i, actions[i]))
+            i = j
+        return b"".join(parts)
+
+    @classmethod
+    def decode(cls, data) -> "Recording":
+        magic, version, seed, world_screens, herd_size, w, h, ticks, checksum, name_len = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Không phải file ghi input (hoặc khác phiên bản)")
+        offset = HEADER.size + name_len
+        level = bytes(data[HEADER.size:offset]).decode("utf-8")
+        actions = bytearray()
+        for length, mask in RUN.iter_unpack(data[offset:]):
+            actions.extend(bytes((mask,)) * length)
+        if len(actions) != ticks:
+            raise ValueError(f"File hỏng: có {len(actions)} tick, header ghi {ticks}")
+        return cls(level, seed, world_screens, herd_size, (w, h), actions, checksum)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.encode())
+
+    @classmethod
+    def load(cls, path) -> "Recording":
+        with open(path, "rb") as f:
+            return cls.decode(f.read())
+
+
+# ----------------- Ghi khi đang chơi -----------------
+class Recorder:
+    """Ghi input của một level đang chạy; save() ghi file kèm checksum trạng thái lúc đó
+
+    Level phải được dựng với rng=random.Random(seed) để phát lại ra cùng kết quả.
+    """
+
+    def __init__(self, level, seed, path):
+        self.level = level
+        self.path = path
+        self.recording = Recording.for_level(level, seed)
+        level.controls = controls.RecordingControls(level.controls, self.recording.actions)
+
+    def save(self):
+        self.recording.checksum = state_checksum(self.level.snapshot())
+        self.recording.save(self.path)
+
+
+# ----------------- Phát lại -----------------
+def build_level(recording, screen):
+    module, name = recording.level.rsplit(".", 1)
+    cls = getattr(importlib.import_module(module), name)
+    kwargs = {"herd_size": recording.herd_size} if recording.herd_size else {}
+    return cls(screen, rng=random.Random(recording.seed),
+               controls_source=controls.ReplayControls(recording.actions),
+               world_screens=recording.world_screens, **kwargs)
+
+
+def replay(recording, screen, render=False, until=None):
+    """Chạy lại bản ghi, trả về (level, thời gian ms của từng tick)
+
+    render=True thì vẽ một frame sau mỗi tick, để profiler đo cả phần vẽ.
+    """
+    level = build_level(recording, screen)
+    ticks = recording.ticks if until is None else min(until, recording.ticks)
+    times = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        level.update()
+        if render:
+            level.draw(1.0)
+        profiler.end_frame()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return level, times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Phát lại file ghi input của level")
+    parser.add_argument("path")
+    parser.add_argument("--render", action="store_true", help="vẽ mỗi tick (mặc định chỉ mô phỏng)")
+    parser.add_argument("--backend", choices=("surface", "sdl2"), default=None)
+    parser.add_argument("--until", type=int, help="chỉ chạy tới tick này")
+    parser.add_argument("--profile", metavar="OUT", help="bật profiler, ghi từng tick ra file CSV / JSON")
+    parser.add_argument("--slowest", type=int, default=5, help="in N tick chậm nhất")
+    args = parser.parse_args(argv)
+
+    recording = Recording.load(args.path)
+    if not args.render:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.display.init()
+    pygame.font.init()
+    from render import open_window
+    screen = open_window(recording.size, backend=args.backend)
+    if args.profile:
+        profiler.enabled = True
+        profiler.export_path = args.profile
+
+    print(f"{recording.level} seed={recording.seed} world={recording.world_screens} "
+          f"herd={recording.herd_size} {recording.ticks} tick")
+    start = time.perf_counter()
+    level, times = replay(recording, screen, args.render, args.until)
+    elapsed = time.perf_counter() - start
+    print(f"Đã chạy {len(times)} tick trong {elapsed:.2f}s")
+    for i in sorted(range(len(times)), key=times.__getitem__, reverse=True)[:args.slowest]:
+        print(f"  tick {i:7d}  {times[i]:7.2f} ms")
+    profiler.close()
+
+    if len(times) < recording.ticks:
+        return 0
+    if state_checksum(level.snapshot()) != recording.checksum:
+        print("KHÁC trạng thái đã ghi: phát lại không tất định")
+        return 1
+    print("Trạng thái cuối khớp với bản ghi.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
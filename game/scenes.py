@@ -0,0 +1,163 @@
+import os
+from collections import OrderedDict
+
+import pygame
+
+from profiler import profiler
+from timestep import FixedTimestep, RENDER_FPS, TIME_SCALE
+
+# Số level giữ lại trong pool (CULVER_SCENE_POOL), level cũ nhất bị giải phóng trước
+SCENE_POOL_CAP = int(os.environ.get("CULVER_SCENE_POOL", "2"))
+# Phím đổi tốc độ mô phỏng: chậm lại / nhanh lên một nấc / về tốc độ thường
+TIME_SCALE_KEYS = {pygame.K_F5: -1, pygame.K_F6: 1, pygame.K_F7: 0}
+
+
+# ----------------- Scene -----------------
+class Scene:
+    """Một màn hình trong stack: nhận event, update theo bước cố định, vẽ frame
+
+    `draw()` tự present frame (flip hoặc renderer.present()).
+    """
+
+    manager = None
+
+    def enter(self):
+        """Scene lên đỉnh stack (được push hoặc scene phía trên vừa pop)"""
+
+    def exit(self):
+        """Scene rời đỉnh stack (bị pop, bị replace hoặc bị che)"""
+
+    def handle_event(self, event):
+        pass
+
+    def update(self):
+        pass
+
+    def draw(self, alpha=1.0):
+        pass
+
+    def release(self):
+        """Trả lại bộ nhớ khi pool bỏ scene này"""
+
+
+# ----------------- Scene stack -----------------
+class SceneStack:
+    """Stack scene với push / pop / replace và vòng lặp frame dùng chung"""
+
+    def __init__(self, *scenes, time_scale=TIME_SCALE):
+        self.scenes = []
+        self.timestep = FixedTimestep(time_scale=time_scale)
+        for scene in scenes:
+            self.push(scene)
+
+    @property
+    def top(self):
+        return self.scenes[-1] if self.scenes else None
+
+    def push(self, scene):
+        if self.scenes:
+            self.top.exit()
+        scene.manager = self
+        self.scenes.append(scene)
+        scene.enter()
+
+    def pop(self):
+        scene = self.scenes.pop()
+        scene.exit()
+        scene.manager = None
+        if self.scenes:
+            self.top.enter()
+        return scene
+
+    def replace(self, scene):
+        old = self.scenes.pop()
+        old.exit()
+        old.manager = None
+        scene.manager = self
+        self.scenes.append(scene)
+        scene.enter()
+        return old
+
+    def clear(self):
+        while self.scenes:
+            self.pop()
+
+    def run(self, fps=RENDER_FPS) -> bool:
+        """Chạy tới khi stack rỗng; trả về False nếu người chơi đóng cửa sổ"""
+        clock = pygame.time.Clock()
+        timestep = self.timestep
+        timestep.reset()
+        clock.tick()
+        while self.scenes:
+            scene = self.top
+            with profiler.phase("events"):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.clear()
+                        return False
+                    profiler.handle_event(event)
+                    if event.type == pygame.KEYDOWN and event.key in TIME_SCALE_KEYS:
+                        timestep.shift_scale(TIME_SCALE_KEYS[event.key])
+                        continue
+                    if self.scenes:
+                        self.top.handle_event(event)
+
+            steps = timestep.advance(clock.tick(fps))
+            if scene is not self.top:
+                # scene mới không phải bù phần thời gian của scene cũ
+                timestep.reset()
+                continue
+
+            for _ in range(steps):
+                scene.update()
+                if scene is not self.top:
+                    break
+            if scene is self.top:
+                scene.draw(timestep.alpha)
+                profiler.end_frame()
+            else:
+                timestep.reset()
+        return True
+
+
+# ----------------- Pool scene -----------------
+class ScenePool:
+    """Giữ các scene đã dựng theo key để quay lại là chạy tiếp ngay
+
+    Vượt quá `cap` thì scene ít dùng nhất (không nằm trên stack) bị
+    release() và bỏ khỏi pool.
+    """
+
+    def __init__(self, factory, cap=SCENE_POOL_CAP):
+        self.factory = factory
+        self.cap = cap
+        self._scenes = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._scenes
+
+    def get(self, key) -> Scene:
+        scene = self._scenes.get(key)
+        if scene is None:
+            scene = self.factory(key)
+            self._scenes[key] = scene
+        self._scenes.move_to_end(key)
+        self._evict()
+        return scene
+
+    def discard(self, key):
+        scene = self._scenes.pop(key, None)
+        if scene is not None:
+            scene.release()
+
+    def clear(self):
+        for key in list(self._scenes):
+            self.discard(key)
+
+    def _evict(self):
+        # scene vừa lấy (cuối danh sách) luôn được giữ lại
+        for key in list(self._scenes)[:-1]:
+            if len(self._scenes) <= self.cap:
+                break
+            if self._scenes[key].manager is None:
+                self.discard(key)
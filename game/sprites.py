@@ -0,0 +1,30 @@
+import pygame
+
+from render import mirrored
+
+
+# ----------------- Bộ frame hai hướng -----------------
+class FrameSet:
+    """Frame trái/phải kèm mask, dựng một lần lúc load
+
+    `facing` là hướng mà ảnh gốc đang quay về (-1 = trái, 1 = phải).
+    Mỗi frame khi chạy chỉ còn là một phép tra chỉ số.
+    """
+
+    def __init__(self, images, facing=-1):
+        images = list(images)
+        flipped = [mirrored(img) for img in images]
+        self.frames = {facing: images, -facing: flipped}
+        self.masks = {
+            direction: [pygame.mask.from_surface(img) for img in imgs]
+            for direction, imgs in self.frames.items()
+        }
+
+    def __len__(self):
+        return len(self.frames[-1])
+
+    def image(self, direction, index) -> pygame.Surface:
+        return self.frames[direction][index]
+
+    def mask(self, direction, index) -> pygame.mask.Mask:
+        return self.masks[direction][index]
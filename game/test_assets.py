@@ -0,0 +1,59 @@
+import pygame
+
+from assets import AssetManager, surface_bytes
+
+
+def make_image(tmp_path, name, size=(16, 16)):
+    surf = pygame.Surface(size, pygame.SRCALPHA)
+    surf.fill((200, 100, 50, 255))
+    path = tmp_path / name
+    pygame.image.save(surf, str(path))
+    return str(path)
+
+
+def test_hit_and_miss_count_once_per_load(tmp_path):
+    path = make_image(tmp_path, "a.png")
+    assets = AssetManager()
+    first = assets.load(path)
+    assert assets.load(path) is first
+    assert (assets.hits, assets.misses) == (1, 1)
+
+
+def test_scaled_miss_counts_one_lookup(tmp_path):
+    path = make_image(tmp_path, "a.png")
+    assets = AssetManager()
+    scaled = assets.load(path, size=(8, 8))
+    assert scaled.get_size() == (8, 8)
+    # lấy bản gốc để scale không tính thêm một lượt tra cache
+    assert (assets.hits, assets.misses) == (0, 1)
+    assert assets.load(path, size=(8, 8)) is scaled
+    # bản gốc đã nằm trong cache từ lần scale
+    assets.load(path)
+    assert (assets.hits, assets.misses) == (2, 1)
+    assert assets.stats()["hit_rate"] == 2 / 3
+
+
+def test_missing_file(tmp_path):
+    assets = AssetManager()
+    assert assets.load(str(tmp_path / "none.png")) is None
+    assert assets.load(str(tmp_path / "none.png"), size=(8, 8)) is None
+    assert (assets.hits, assets.misses) == (0, 2)
+
+
+def test_lru_eviction_keeps_budget(tmp_path):
+    paths = [make_image(tmp_path, f"{name}.png") for name in "abc"]
+    assets = AssetManager()
+    one = surface_bytes(assets.load(paths[0]))
+    assets.set_budget(2.5 * one / (1024 * 1024))  # vừa đủ hai ảnh
+    assets.load(paths[1])
+    assets.load(paths[0])  # a mới dùng → b cũ nhất
+    assets.load(paths[2])
+    assert assets.evictions == 1
+    assert assets.used_bytes == 2 * one <= assets.budget_bytes
+    hits = assets.hits
+    assets.load(paths[0])
+    assets.load(paths[2])
+    assert assets.hits == hits + 2
+    misses = assets.misses
+    assets.load(paths[1])  # b đã bị bỏ → phải giải mã lại
+    assert assets.misses == misses + 1
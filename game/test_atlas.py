@@ -0,0 +1,16 @@
+import atlas
+
+
+def test_every_sprite_has_a_source_file():
+    assert atlas.missing() == []
+
+
+def test_missing_lists_absent_sources():
+    sprites = atlas.SPRITES + [("player/walkleft5.png", (100, 150))]
+    assert atlas.missing(sprites) == ["player/walkleft5.png"]
+
+
+def test_check_fails_on_missing_source(monkeypatch, capsys):
+    monkeypatch.setattr(atlas, "missing", lambda: ["player/walkleft5.png"])
+    assert atlas.main(["--check"]) == 1
+    assert "Thiếu file gốc: player/walkleft5.png" in capsys.readouterr().out
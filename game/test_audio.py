@@ -0,0 +1,70 @@
+import pygame
+import pytest
+
+import audio
+from audio import Audio, SFX, tone
+
+
+@pytest.fixture
+def mixer(monkeypatch, tmp_path):
+    """Audio 2 kênh trên driver dummy, thư mục SFX / nhạc rỗng"""
+    monkeypatch.setenv("SDL_AUDIODRIVER", "dummy")
+    monkeypatch.setattr(audio, "SOUND_DIR", str(tmp_path))
+    monkeypatch.setattr(audio, "MUSIC_DIR", str(tmp_path))
+    sfx = Audio(voices=2)
+    assert sfx.init()
+    # tiếng dài để kênh còn bận suốt test
+    frequency, size, channels = pygame.mixer.get_init()
+    long_tone = tone(300, 300, 5000, frequency=frequency, size=size, channels=channels)
+    sfx.bank = {name: long_tone for name in SFX}
+    yield sfx
+    sfx.quit()
+
+
+def test_missing_sfx_falls_back_to_tone(monkeypatch, tmp_path):
+    monkeypatch.setenv("SDL_AUDIODRIVER", "dummy")
+    monkeypatch.setattr(audio, "SOUND_DIR", str(tmp_path))
+    sfx = Audio(voices=2)
+    try:
+        assert sfx.init()
+        assert sorted(sfx.bank) == sorted(SFX)
+        for name, (_, _, (_, _, ms)) in SFX.items():
+            assert sfx.bank[name].get_length() == pytest.approx(ms / 1000, abs=0.01)
+    finally:
+        sfx.quit()
+
+
+def test_higher_priority_steals_oldest_lower_voice(mixer):
+    first = mixer.play("jump")
+    second = mixer.play("jump")
+    assert first is not second
+    assert mixer.play("hit") is first  # cùng bận → cướp tiếng cũ nhất
+    assert mixer.play("hit") is second
+    assert mixer.stolen == 2 and mixer.dropped == 0
+
+
+def test_equal_priority_steals_oldest(mixer):
+    first = mixer.play("pick")
+    mixer.play("charge")
+    assert mixer.play("charge") is first
+
+
+def test_lower_priority_is_dropped_when_all_busy(mixer):
+    mixer.play("hit")
+    mixer.play("hit")
+    assert mixer.play("jump") is None
+    assert mixer.dropped == 1 and mixer.stolen == 0
+
+
+def test_missing_music_does_not_raise(mixer):
+    mixer.play_music("chapter1")
+    mixer.play_music("chapter1")
+    assert mixer.music is None
+    mixer.stop_music()
+
+
+def test_not_ready_is_silent():
+    sfx = Audio(voices=2)
+    assert sfx.play("hit") is None
+    sfx.play_music("chapter1")
+    assert sfx.music is None
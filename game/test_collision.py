@@ -0,0 +1,112 @@
+import numpy as np
+import pygame
+
+import collision
+from collision import CollisionWorld
+
+
+class Row:
+    """Nhóm body dạng mảng giống Herd: rect/mask lấy theo chỉ số"""
+
+    def __init__(self, xs, width=20, height=10, top=0):
+        self.x = np.asarray(xs, dtype=np.float64)
+        self.width = width
+        self.height = height
+        self.top = top
+        self.mask = pygame.mask.Mask((width, height), fill=True)
+
+    def get_rect_mask(self, i):
+        return pygame.Rect(int(self.x[i]), self.top, self.width, self.height), self.mask
+
+
+def test_add_query_remove():
+    world = CollisionWorld()
+    world.add("a", (10, 10, 20, 20), collision.PICKUP)
+    world.add("b", (500, 10, 20, 20), collision.PICKUP)
+    assert world.query(pygame.Rect(0, 0, 40, 40)) == ["a"]
+    assert world.last_candidates == 1
+
+    world.remove("a")
+    assert world.query(pygame.Rect(0, 0, 40, 40)) == []
+    assert not world.cells.get((0, 0))
+    world.remove("a")  # bỏ key không có thì không lỗi
+
+
+def test_readd_replaces_old_cells():
+    world = CollisionWorld()
+    world.add("a", (10, 10, 20, 20), collision.PICKUP)
+    world.add("a", (300, 10, 20, 20), collision.PICKUP)
+    assert world.query(pygame.Rect(0, 0, 40, 40)) == []
+    assert world.query(pygame.Rect(290, 0, 40, 40)) == ["a"]
+    assert sum("a" in cell for cell in world.cells.values()) == 1
+
+
+def test_body_spanning_cells():
+    world = CollisionWorld(cell_size=100)
+    world.add("wide", (50, 0, 200, 10), collision.HAZARD)
+    assert len(world.cells) == 3
+    for x in (60, 160, 240):
+        assert world.query(pygame.Rect(x, 0, 5, 5)) == ["wide"]
+
+
+def test_layers_filter():
+    world = CollisionWorld()
+    world.add("pick", (0, 0, 10, 10), collision.PICKUP)
+    world.add("hurt", (0, 0, 10, 10), collision.HAZARD | collision.TRIGGER)
+    probe = pygame.Rect(0, 0, 10, 10)
+    assert world.query(probe, collision.PICKUP) == ["pick"]
+    assert world.query(probe, collision.TRIGGER) == ["hurt"]
+    assert sorted(world.query(probe)) == ["hurt", "pick"]
+
+
+def test_overlap_uses_masks():
+    world = CollisionWorld()
+    # body chỉ có nửa trái đặc
+    half = pygame.mask.Mask((20, 20))
+    half.draw(pygame.mask.Mask((10, 20), fill=True), (0, 0))
+    world.add("half", (0, 0, 20, 20), collision.HAZARD, mask=half)
+    dot = pygame.mask.Mask((4, 4), fill=True)
+
+    assert world.overlap(pygame.Rect(2, 2, 4, 4), dot) == ["half"]
+    # chạm rect nhưng rơi vào nửa trong suốt
+    assert world.query(pygame.Rect(14, 2, 4, 4)) == ["half"]
+    assert world.overlap(pygame.Rect(14, 2, 4, 4), dot) == []
+    # không có mask thì coi như cả rect
+    assert world.overlap(pygame.Rect(14, 2, 4, 4), None) == ["half"]
+
+
+def test_sync_group_follows_owner():
+    world = CollisionWorld()
+    row = Row([0.0, 300.0, 600.0])
+    world.sync_group("row", row, row.x, row.top, row.width, row.height, collision.HAZARD)
+    assert world.query(pygame.Rect(305, 0, 4, 4)) == [("row", 1)]
+
+    row.x[1] = 900.0
+    world.sync_group("row", row, row.x, row.top, row.width, row.height, collision.HAZARD)
+    assert world.query(pygame.Rect(305, 0, 4, 4)) == []
+    assert world.query(pygame.Rect(905, 0, 4, 4)) == [("row", 1)]
+    # các body không đổi ô vẫn ở nguyên chỗ
+    assert world.query(pygame.Rect(5, 0, 4, 4)) == [("row", 0)]
+
+
+def test_sync_group_resize_drops_stale_keys():
+    world = CollisionWorld()
+    row = Row([0.0, 300.0, 600.0])
+    world.sync_group("row", row, row.x, row.top, row.width, row.height, collision.HAZARD)
+    row = Row([0.0])
+    world.sync_group("row", row, row.x, row.top, row.width, row.height, collision.HAZARD)
+    assert sorted(k for k in world.bodies if k[0] == "row") == [("row", 0)]
+    assert world.query(pygame.Rect(605, 0, 4, 4)) == []
+
+
+def test_clear():
+    world = CollisionWorld()
+    world.add("a", (0, 0, 10, 10), collision.PICKUP)
+    row = Row([50.0])
+    world.sync_group("row", row, row.x, row.top, row.width, row.height, collision.HAZARD)
+    world.clear()
+    assert not world.bodies and not world.cells
+    assert world.query(pygame.Rect(0, 0, 100, 100)) == []
+    # sau clear, sync_group dựng lại nhóm từ đầu
+    world.sync_group("row", row, row.x, row.top, row.width, row.height, collision.HAZARD)
+    assert world.query(pygame.Rect(55, 0, 4, 4)) == [("row", 0)]
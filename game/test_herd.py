@@ -0,0 +1,171 @@
+import math
+import random
+
+import numpy as np
+import pygame
+import pytest
+
+from herd import Herd, STATE_NAMES
+
+
+class Frames:
+    """FrameSet giả: chỉ cần số frame và kích thước ảnh"""
+
+    def __len__(self):
+        return 6
+
+    def image(self, direction, index):
+        return pygame.Surface((160, 120))
+
+
+class RecordingRng:
+    """Bọc numpy Generator, ghi lại các mảng random(n) mà Herd đã dùng ở mỗi bước"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.draws = []
+
+    def random(self, n):
+        values = self.rng.random(n)
+        self.draws.append(values)
+        return values
+
+    def __getattr__(self, name):
+        return getattr(self.rng, name)
+
+
+class Buffalo:
+    """Con trâu đơn trước khi có Herd (chép từ level2.Buffalo cũ, bỏ phần ảnh)
+
+    Số ngẫu nhiên được đưa vào từ ngoài để dùng đúng giá trị Herd đã lấy.
+    """
+
+    animation_speed = 120
+    max_speed = 3
+    accel = 0.05
+    decel = 0.1
+    aggro_range = 250
+    charge_speed = 7
+
+    def __init__(self, x, direction, screen_width, frames=6):
+        self.frames = frames
+        self.index = 0
+        self.timer = 0
+        self.x = x
+        self.speed = 0
+        self.direction = direction
+        self.screen_width = screen_width
+        self.state = "idle"
+        self.cooldown_timer = 0
+        self.charge_target_x = None
+
+    def update(self, player_rect, now, wake_draw, wander_draw):
+        if now - self.timer >= self.animation_speed:
+            self.index = (self.index + 1) % self.frames
+            self.timer = now
+
+        if self.state == "cooldown" and now - self.cooldown_timer >= 2500:
+            self.state = "idle"
+            if wake_draw < 0.5:
+                self.direction *= -1
+
+        dx = player_rect.centerx - self.x
+        if self.state == "idle" and abs(dx) < self.aggro_range:
+            self.state = "charge"
+            self.direction = 1 if dx > 0 else -1
+            self.charge_target_x = player_rect.centerx + self.direction * 200
+
+        if self.state == "idle":
+            if self.speed < self.max_speed:
+                self.speed += self.accel
+            self.x += self.direction * self.speed
+            if wander_draw < 0.005:
+                if self.speed > 0.3:
+                    self.speed -= self.decel * 5
+                else:
+                    self.direction *= -1
+        elif self.state == "charge":
+            self.x += self.direction * self.charge_speed
+            if (self.direction == 1 and self.x >= self.charge_target_x) or \
+               (self.direction == -1 and self.x <= self.charge_target_x):
+                self.state = "overrun"
+                self.cooldown_timer = now
+        elif self.state == "overrun":
+            if now - self.cooldown_timer >= 1000:
+                self.state = "cooldown"
+                self.cooldown_timer = now
+        elif self.state == "cooldown":
+            self.speed = max(0, self.speed - self.decel * 2)
+            self.x += self.direction * self.speed
+
+        if self.x < 80:
+            self.x = 80
+            self.direction = 1
+        elif self.x > self.screen_width - 80:
+            self.x = self.screen_width - 80
+            self.direction = -1
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_herd_matches_single_buffalo(seed):
+    world_width, count, ticks = 1280, 6, 1500
+    herd = Herd(Frames(), count, 600, world_width, random.Random(seed))
+    rng = RecordingRng(herd.rng)
+    herd.rng = rng
+    buffaloes = [Buffalo(float(x), int(d), world_width) for x, d in zip(herd.x, herd.direction)]
+    stun_rng = random.Random(seed + 1000)
+
+    now = 0.0
+    for tick in range(ticks):
+        now += 1000.0 / 60
+        # người chơi đi qua lại cả màn hình để trâu lao tới đủ kiểu
+        player_rect = pygame.Rect(0, 0, 80, 160)
+        player_rect.centerx = int(world_width / 2 + 560 * math.sin(tick / 90))
+
+        rng.draws.clear()
+        herd.update(player_rect, now)
+        wake, wander = rng.draws
+        for i, buffalo in enumerate(buffaloes):
+            buffalo.update(player_rect, now, wake[i], wander[i])
+
+        # thỉnh thoảng một con húc trúng người chơi
+        if stun_rng.random() < 0.01:
+            i = stun_rng.randrange(count)
+            herd.stun(i, now)
+            buffaloes[i].state = "cooldown"
+            buffaloes[i].cooldown_timer = now
+
+        for i, buffalo in enumerate(buffaloes):
+            assert herd.describe(i) == (buffalo.x, buffalo.speed, buffalo.direction, buffalo.state), (tick, i)
+            assert int(herd.index[i]) == buffalo.index
+
+
+def test_counts_and_charge_events():
+    herd = Herd(Frames(), 4, 600, 1280, random.Random(3))
+    herd.x[:] = [100, 400, 900, 1200]
+    player_rect = pygame.Rect(0, 0, 80, 160)
+    player_rect.centerx = 450
+    herd.update(player_rect, 16.0)
+    # chỉ con ở x=400 nằm trong tầm 250 px nên lao tới
+    assert sorted(herd.new_charges.tolist()) == [1]
+    assert herd.counts()[STATE_NAMES.index("charge")] == 1
+    herd.update(player_rect, 32.0)
+    assert len(herd.new_charges) == 0
+
+
+def test_blits_culls_outside_camera():
+    herd = Herd(Frames(), 3, 600, 4000, random.Random(0))
+    herd.x[:] = herd.prev_x[:] = [100, 1500, 3900]
+    items = herd.blits(1.0, camera_x=1000, view_width=1280)
+    assert [pos for _, pos in items] == [(1500 - 1000 - 80, 600 - 120)]
+
+
+def test_active_mask_freezes_unloaded():
+    herd = Herd(Frames(), 2, 600, 4000, random.Random(0))
+    herd.x[:] = [500, 3000]
+    before = herd.x.copy()
+    player_rect = pygame.Rect(0, 0, 80, 160)
+    for step in range(30):
+        herd.update(player_rect, 16.0 * (step + 1), np.array([True, False]))
+    assert herd.x[1] == before[1]
+    assert herd.x[0] != before[0]
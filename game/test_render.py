@@ -0,0 +1,59 @@
+import pygame
+
+from render import RenderQueue, Z_EFFECTS, Z_PLAYER, Z_WORLD, merge_rects
+
+
+def test_merge_rects_joins_overlapping_chains():
+    # a chạm b, b chạm c: cả ba gộp thành một dù a và c không chạm nhau
+    rects = [(0, 0, 10, 10), (8, 0, 10, 10), (16, 0, 10, 10)]
+    assert merge_rects(rects) == [pygame.Rect(0, 0, 26, 10)]
+
+
+def test_merge_rects_keeps_separate_rects():
+    rects = [(0, 0, 10, 10), (50, 50, 10, 10)]
+    assert sorted(merge_rects(rects)) == [pygame.Rect(0, 0, 10, 10), pygame.Rect(50, 50, 10, 10)]
+
+
+def test_merge_rects_result_has_no_overlaps():
+    rects = [(x * 7 % 90, x * 13 % 70, 12, 9) for x in range(40)]
+    merged = merge_rects(rects)
+    for i, a in enumerate(merged):
+        assert a.collidelist(merged[i + 1:]) == -1
+    # mọi vùng ban đầu vẫn được phủ
+    for rect in rects:
+        assert any(m.contains(rect) for m in merged)
+
+
+def test_merge_rects_empty():
+    assert merge_rects([]) == []
+
+
+class Sink:
+    """Renderer giả: ghi lại những gì flush gửi sang"""
+
+    def blits(self, seq, groups=None):
+        self.seq = list(seq)
+        self.groups = groups
+
+
+def test_render_queue_sorts_by_z_and_keeps_order_within_layer():
+    queue = RenderQueue()
+    sink = Sink()
+    queue.add(Z_PLAYER, "player", (0, 0))
+    queue.extend(Z_EFFECTS, [("dust", (1, 1)), ("dust", (2, 2))])
+    queue.add(Z_WORLD, "stone", (3, 3))
+    queue.add(Z_WORLD, "arrow", (4, 4))
+    queue.flush(sink)
+    assert [item[0] for item in sink.seq] == ["stone", "arrow", "dust", "dust", "player"]
+    assert sink.groups == [1, 1, 2, 1]
+    assert queue.draw_calls == 5
+
+
+def test_render_queue_flush_clears():
+    queue = RenderQueue()
+    sink = Sink()
+    queue.add(Z_WORLD, "stone", (0, 0))
+    queue.flush(sink)
+    sink.seq = None
+    queue.flush(sink)
+    assert sink.seq is None and queue.draw_calls == 0
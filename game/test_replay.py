@@ -0,0 +1,87 @@
+import random
+
+import pygame
+import pytest
+
+import controls
+import replay
+from replay import MAX_RUN, RUN, Recorder, Recording, state_checksum
+
+
+def make_recording(actions, **kwargs):
+    return Recording("level2.Level2", 1234567890123, world_screens=3, herd_size=40,
+                     size=(960, 540), actions=bytearray(actions), checksum=0xDEADBEEF, **kwargs)
+
+
+def test_roundtrip_keeps_everything():
+    rec = make_recording([0, 0, 1, 1, 1, 5, 0, 12, 12])
+    back = Recording.decode(rec.encode())
+    assert back.level == "level2.Level2"
+    assert back.seed == 1234567890123
+    assert (back.world_screens, back.herd_size, back.size) == (3, 40, (960, 540))
+    assert back.checksum == 0xDEADBEEF
+    assert back.actions == rec.actions
+    assert back.ticks == 9
+
+
+def test_empty_recording():
+    back = Recording.decode(make_recording([]).encode())
+    assert back.ticks == 0
+
+
+def test_runs_are_compressed():
+    rec = make_recording([3] * 1000 + [0] * 1000)
+    body = rec.encode()
+    assert len(body) == len(make_recording([]).encode()) + 2 * RUN.size
+
+
+def test_run_longer_than_max_run_is_split():
+    actions = [7] * (MAX_RUN * 2 + 5) + [1]
+    rec = make_recording(actions)
+    data = rec.encode()
+    assert len(data) == len(make_recording([]).encode()) + 4 * RUN.size
+    assert Recording.decode(data).actions == bytearray(actions)
+
+
+def test_bad_magic_or_version():
+    data = bytearray(make_recording([1, 2]).encode())
+    bad_magic = bytes(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        Recording.decode(bad_magic)
+    data[4] = replay.VERSION + 1
+    with pytest.raises(ValueError):
+        Recording.decode(bytes(data))
+
+
+def test_truncated_runs_are_rejected():
+    data = make_recording([1, 2, 3]).encode()
+    with pytest.raises(ValueError):
+        Recording.decode(data[:-RUN.size])
+
+
+def test_save_load(tmp_path):
+    rec = make_recording([0, 4, 4, 8])
+    path = tmp_path / "run.culrec"
+    rec.save(path)
+    back = Recording.load(path)
+    assert back.actions == rec.actions and back.seed == rec.seed
+
+
+def test_replay_matches_recorded_state(tmp_path):
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((1280, 720))
+    from level1 import Level1
+
+    script = controls.ScriptedControls([(40, "right"), (10, "right+jump"), (30, "left"), (20, "pick")], loop=True)
+    level = Level1(screen, rng=random.Random(7), controls_source=script)
+    recorder = Recorder(level, 7, tmp_path / "l1.culrec")
+    for _ in range(400):
+        level.update()
+    recorder.save()
+
+    recording = Recording.load(tmp_path / "l1.culrec")
+    assert recording.ticks == 400
+    played, times = replay.replay(recording, screen)
+    assert len(times) == 400
+    assert state_checksum(played.snapshot()) == recording.checksum
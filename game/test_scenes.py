@@ -0,0 +1,73 @@
+from scenes import Scene, ScenePool, SceneStack
+
+
+class Recorder(Scene):
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def enter(self):
+        self.log.append(("enter", self.name))
+
+    def exit(self):
+        self.log.append(("exit", self.name))
+
+    def release(self):
+        self.log.append(("release", self.name))
+
+
+def make_pool(cap, log):
+    return ScenePool(lambda key: Recorder(key, log), cap=cap)
+
+
+def test_pool_reuses_built_scene():
+    log = []
+    pool = make_pool(2, log)
+    first = pool.get("a")
+    assert pool.get("a") is first
+    assert "a" in pool
+
+
+def test_pool_evicts_least_recently_used():
+    log = []
+    pool = make_pool(2, log)
+    pool.get("a")
+    pool.get("b")
+    pool.get("a")
+    pool.get("c")
+    assert "b" not in pool
+    assert "a" in pool and "c" in pool
+    assert ("release", "b") in log
+
+
+def test_pool_keeps_scene_on_stack():
+    log = []
+    pool = make_pool(1, log)
+    stack = SceneStack(pool.get("a"))
+    pool.get("b")
+    # "a" đang chạy trên stack nên không bị giải phóng dù vượt cap
+    assert "a" in pool
+    stack.pop()
+    pool.get("c")
+    assert "a" not in pool
+
+
+def test_pool_clear_releases_everything():
+    log = []
+    pool = make_pool(3, log)
+    pool.get("a")
+    pool.get("b")
+    pool.clear()
+    assert [entry for entry in log if entry[0] == "release"] == [("release", "a"), ("release", "b")]
+
+
+def test_stack_enter_exit_order():
+    log = []
+    menu, level = Recorder("menu", log), Recorder("level", log)
+    stack = SceneStack(menu)
+    stack.push(level)
+    assert stack.top is level and level.manager is stack
+    stack.pop()
+    assert level.manager is None
+    assert log == [("enter", "menu"), ("exit", "menu"), ("enter", "level"),
+                   ("exit", "level"), ("enter", "menu")]
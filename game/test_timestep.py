@@ -0,0 +1,50 @@
+import pytest
+
+from timestep import FixedTimestep, TIME_SCALES
+
+
+def test_advance_accumulates_remainder():
+    timestep = FixedTimestep(hz=60)
+    assert timestep.advance(10.0) == 0
+    assert timestep.advance(10.0) == 1
+    assert timestep.alpha == pytest.approx((20.0 - timestep.step_ms) / timestep.step_ms)
+
+
+def test_steps_match_elapsed_time():
+    timestep = FixedTimestep(hz=60)
+    total = sum(timestep.advance(7.0) for _ in range(1000))
+    assert total == int(7000.0 // timestep.step_ms)
+
+
+def test_slow_frame_is_clamped():
+    timestep = FixedTimestep(hz=60, max_steps=8)
+    assert timestep.advance(1000.0) == 8
+    # phần thời gian bị bỏ không dồn sang frame sau
+    assert timestep.accumulator == 0.0
+    assert timestep.advance(1.0) == 0
+
+
+def test_time_scale_changes_step_rate():
+    fast = FixedTimestep(hz=60, time_scale=2.0)
+    slow = FixedTimestep(hz=60, time_scale=0.5)
+    assert sum(fast.advance(1000 / 60) for _ in range(60)) == 120
+    assert sum(slow.advance(1000 / 60) for _ in range(60)) == 30
+
+
+def test_shift_scale_walks_the_presets():
+    timestep = FixedTimestep()
+    assert timestep.shift_scale(1) == 2.0
+    for _ in range(len(TIME_SCALES)):
+        timestep.shift_scale(1)
+    assert timestep.time_scale == TIME_SCALES[-1]
+    for _ in range(len(TIME_SCALES)):
+        timestep.shift_scale(-1)
+    assert timestep.time_scale == TIME_SCALES[0]
+    assert timestep.shift_scale(0) == 1.0
+
+
+def test_reset_drops_accumulated_time():
+    timestep = FixedTimestep()
+    timestep.advance(10.0)
+    timestep.reset()
+    assert timestep.alpha == 0.0
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+
+import pygame
+
+
+# ----------------- Text có viền (cache) -----------------
+class TextRenderer:
+    """Render chữ có viền một lần rồi giữ trong cache LRU có giới hạn
+
+    Key gồm (text, font, màu chữ, màu viền, độ dày viền). Viền được dựng
+    bằng một lần giãn mask (convolve với kernel hình tròn) thay vì render
+    lại chữ N lần. Đổi alpha khi fade chỉ set_alpha trên surface đã cache.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._kernels = {}
+
+    def render(self, text, font, color, outline_color=(0, 0, 0), outline_width=0) -> pygame.Surface:
+        key = (text, font, tuple(color), tuple(outline_color), outline_width)
+        surf = self._cache.get(key)
+        if surf is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return surf
+
+        self.misses += 1
+        surf = self._build(text, font, color, outline_color, outline_width)
+        self._cache[key] = surf
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return surf
+
+    def placed(self, text, font, color, outline_color=(0, 0, 0), outline_width=0,
+               center=(0, 0), alpha=255) -> tuple:
+        """(surface, rect) của chữ đặt giữa tại center, để gửi vào hàng đợi vẽ"""
+        surf = self.render(text, font, color, outline_color, outline_width)
+        surf.set_alpha(alpha)
+        return surf, surf.get_rect(center=center)
+
+    def blit(self, dest, text, font, color, outline_color=(0, 0, 0), outline_width=0,
+             center=(0, 0), alpha=255) -> pygame.Rect:
+        surf, rect = self.placed(text, font, color, outline_color, outline_width, center, alpha)
+        dest.blit(surf, rect)
+        return rect
+
+    def clear(self):
+        self._cache.clear()
+
+    def surfaces(self) -> list:
+        """Các surface chữ đang giữ trong cache (để báo cáo bộ nhớ)"""
+        return list(self._cache.values())
+
+    # ---- nội bộ ----
+    def _kernel(self, radius):
+        kernel = self._kernels.get(radius)
+        if kernel is None:
+            size = radius * 2 + 1
+            kernel = pygame.mask.Mask((size, size))
+            for dx in range(-radius, radius + 1):
+                for dy in range(-radius, radius + 1):
+                    if dx * dx + dy * dy <= radius * radius:
+                        kernel.set_at((dx + radius, dy + radius), 1)
+            self._kernels[radius] = kernel
+        return kernel
+
+    def _build(self, text, font, color, outline_color, outline_width):
+        base = font.render(text, True, color)
+        if outline_width <= 0:
+            surf = base
+        else:
+            # convolve trả về mask lớn hơn 2 * outline_width, chữ nằm đúng tại (w, w)
+            outline = pygame.mask.from_surface(base).convolve(self._kernel(outline_width))
+            surf = outline.to_surface(setcolor=outline_color, unsetcolor=(0, 0, 0, 0))
+            surf.blit(base, (outline_width, outline_width))
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert_alpha()
+        return surf
+
+
+text_renderer = TextRenderer()
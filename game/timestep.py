@@ -0,0 +1,62 @@
+import os
+
+# ----------------- Cấu hình -----------------
+SIM_HZ = 60
+STEP_MS = 1000.0 / SIM_HZ
+# Giới hạn FPS render (0 = không giới hạn, ví dụ cho màn 120/144 Hz)
+RENDER_FPS = int(os.environ.get("CULVER_FPS", "60"))
+# Tốc độ mô phỏng lúc khởi động (CULVER_TIME_SCALE): 0.5 = quay chậm, 2 = tua nhanh
+TIME_SCALE = float(os.environ.get("CULVER_TIME_SCALE", "1"))
+# Các nấc tốc độ khi đổi bằng phím trong lúc chơi
+TIME_SCALES = (0.125, 0.25, 0.5, 1.0, 2.0, 4.0)
+
+
+def lerp(a, b, t):
+    return a + (b - a) * t
+
+
+# ----------------- Bước mô phỏng cố định -----------------
+class FixedTimestep:
+    """Accumulator tách mô phỏng (bước cố định) khỏi tốc độ render
+
+    Mỗi frame gọi `advance(frame_ms)` để biết cần chạy bao nhiêu bước
+    update; `alpha` là phần dư dùng để nội suy vị trí khi vẽ.
+    """
+
+    def __init__(self, hz=SIM_HZ, max_steps=8, time_scale=1.0):
+        self.step_ms = 1000.0 / hz
+        # chặn "spiral of death" khi một frame quá chậm
+        self.max_steps = max_steps
+        # > 1 để tua nhanh: nhiều bước mô phỏng hơn trong mỗi frame render, < 1 để quay chậm
+        self.time_scale = time_scale
+        self.accumulator = 0.0
+
+    def advance(self, frame_ms) -> int:
+        self.accumulator += frame_ms * self.time_scale
+        steps = int(self.accumulator // self.step_ms)
+        if self.max_steps and steps > self.max_steps * self.time_scale:
+            steps = int(self.max_steps * self.time_scale)
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.step_ms
+        return steps
+
+    def reset(self):
+        self.accumulator = 0.0
+
+    def shift_scale(self, direction) -> float:
+        """Lên (direction > 0) / xuống một nấc trong TIME_SCALES, 0 = về tốc độ thường"""
+        if direction == 0:
+            self.time_scale = 1.0
+        else:
+            faster = [s for s in TIME_SCALES if s > self.time_scale]
+            slower = [s for s in TIME_SCALES if s < self.time_scale]
+            if direction > 0 and faster:
+                self.time_scale = faster[0]
+            elif direction < 0 and slower:
+                self.time_scale = slower[-1]
+        return self.time_scale
+
+    @property
+    def alpha(self) -> float:
+        return min(1.0, self.accumulator / self.step_ms)
@@ -0,0 +1,153 @@
+import pygame
+
+
+# ----------------- Overlay dùng lại -----------------
+class Overlay:
+    """Surface phủ toàn màn hình một màu, chỉ tạo lại khi cửa sổ đổi kích thước"""
+
+    def __init__(self, color=(0, 0, 0)):
+        self.color = color
+        self.surface = None
+
+    def get(self, size) -> pygame.Surface:
+        size = tuple(size)
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size)
+            if pygame.display.get_surface() is not None:
+                self.surface = self.surface.convert()
+            self.surface.fill(self.color)
+        return self.surface
+
+    def draw(self, dest, alpha, size=None):
+        alpha = int(alpha)
+        if alpha <= 0:
+            return
+        surf = self.get(size or _dest_size(dest))
+        surf.set_alpha(alpha)
+        dest.blit(surf, (0, 0))
+
+
+_overlays = {}
+
+
+def overlay(color=(0, 0, 0)) -> Overlay:
+    """Overlay dùng chung theo màu"""
+    color = tuple(color)
+    if color not in _overlays:
+        _overlays[color] = Overlay(color)
+    return _overlays[color]
+
+
+def _dest_size(dest):
+    # dest có thể là screen hoặc DirtyRenderer (có .screen)
+    return getattr(dest, "screen", dest).get_size()
+
+
+# ----------------- Transition theo thời gian -----------------
+class Transition:
+    """Hiệu ứng chạy theo ms trong vòng lặp frame bình thường, không chặn event"""
+
+    def __init__(self, duration_ms):
+        self.duration_ms = max(1.0, float(duration_ms))
+        self.elapsed = 0.0
+
+    def update(self, dt_ms) -> float:
+        """Tiến thêm dt_ms, trả về phần thời gian dư sau khi kết thúc"""
+        self.elapsed += dt_ms
+        leftover = max(0.0, self.elapsed - self.duration_ms)
+        self.elapsed = min(self.elapsed, self.duration_ms)
+        return leftover
+
+    @property
+    def progress(self) -> float:
+        return self.elapsed / self.duration_ms
+
+    @property
+    def done(self) -> bool:
+        return self.elapsed >= self.duration_ms
+
+    @property
+    def alpha(self) -> float:
+        return 0.0
+
+    def draw(self, dest):
+        pass
+
+
+class Fade(Transition):
+    """Phủ màu với alpha đi từ start đến end"""
+
+    def __init__(self, start, end, duration_ms, color=(0, 0, 0)):
+        super().__init__(duration_ms)
+        self.start = start
+        self.end = end
+        self.color = color
+
+    @property
+    def alpha(self) -> float:
+        return self.start + (self.end - self.start) * self.progress
+
+    def draw(self, dest):
+        overlay(self.color).draw(dest, self.alpha)
+
+
+class Hold(Fade):
+    """Giữ nguyên một mức phủ trong duration_ms"""
+
+    def __init__(self, alpha, duration_ms, color=(0, 0, 0)):
+        super().__init__(alpha, alpha, duration_ms, color)
+
+
+class Crossfade(Transition):
+    """Ảnh chụp scene cũ mờ dần trên scene mới"""
+
+    _snapshot = Overlay()
+
+    def __init__(self, source, duration_ms):
+        super().__init__(duration_ms)
+        # chép frame cũ vào surface dùng chung, không cấp phát mỗi lần
+        self.snapshot = self._snapshot.get(source.get_size())
+        if hasattr(source, "read_pixels"):
+            # backend sdl2: đọc lại frame từ renderer
+            source.read_pixels(self.snapshot)
+        else:
+            self.snapshot.blit(source, (0, 0))
+
+    @property
+    def alpha(self) -> float:
+        return 255 * (1.0 - self.progress)
+
+    def draw(self, dest):
+        if self.alpha > 0:
+            self.snapshot.set_alpha(int(self.alpha))
+            dest.blit(self.snapshot, (0, 0))
+
+
+class Sequence(Transition):
+    """Chạy lần lượt nhiều transition (vd. fade → hold → fade)"""
+
+    def __init__(self, *steps):
+        super().__init__(sum(step.duration_ms for step in steps))
+        self.steps = list(steps)
+        self.index = 0
+
+    def update(self, dt_ms) -> float:
+        super().update(dt_ms)
+        while dt_ms > 0 and self.index < len(self.steps):
+            dt_ms = self.steps[self.index].update(dt_ms)
+            if self.steps[self.index].done and self.index < len(self.steps) - 1:
+                self.index += 1
+            else:
+                break
+        return dt_ms
+
+    @property
+    def current(self) -> Transition:
+        return self.steps[self.index]
+
+    @property
+    def alpha(self) -> float:
+        return self.current.alpha
+
+    def draw(self, dest):
+        self.current.draw(dest)
@@ -0,0 +1,99 @@
+import math
+import os
+
+from timestep import lerp
+
+# Độ dài level tính theo số màn hình (CULVER_WORLD_SCREENS), mặc định 1 như thiết kế gốc
+WORLD_SCREENS = int(os.environ.get("CULVER_WORLD_SCREENS", "1"))
+
+
+# ----------------- Camera -----------------
+class Camera:
+    """Camera cuộn ngang trong toạ độ world, giữ vị trí bước trước để nội suy"""
+
+    def __init__(self, view_width, world_width, x=0.0):
+        self.view_width = view_width
+        self.world_width = world_width
+        self.x = self.prev_x = self.clamp(x)
+
+    def clamp(self, x) -> float:
+        return max(0.0, min(float(x), float(self.world_width - self.view_width)))
+
+    def follow(self, target_x):
+        """Một bước mô phỏng: đưa target về giữa màn hình (không vượt mép world)"""
+        self.prev_x = self.x
+        self.x = self.clamp(target_x - self.view_width / 2)
+
+    def offset(self, alpha=1.0) -> int:
+        """Toạ độ x (pixel) của mép trái màn hình lúc vẽ"""
+        return int(round(lerp(self.prev_x, self.x, alpha)))
+
+
+# ----------------- Chunk -----------------
+class Chunk:
+    """Một đoạn world; entity trong đoạn này chỉ hoạt động khi chunk đang được nạp"""
+
+    __slots__ = ("index", "left", "right")
+
+    def __init__(self, index, left, right):
+        self.index = index
+        self.left = left
+        self.right = right
+
+
+class ChunkStreamer:
+    """Nạp các chunk quanh camera, nạp trước `ahead` chunk mỗi phía
+
+    Chunk chỉ bị bỏ khi cách vùng nhìn thấy quá `keep` chunk, để đi qua
+    lại ở ranh giới không nạp / bỏ liên tục. Số chunk nằm trong bộ nhớ vì
+    vậy luôn bị chặn, dù world dài bao nhiêu.
+    """
+
+    def __init__(self, world_width, chunk_width, load=None, unload=None, ahead=1, keep=2):
+        self.world_width = world_width
+        self.chunk_width = chunk_width
+        self.count = max(1, math.ceil(world_width / chunk_width))
+        self.load = load
+        self.unload = unload
+        self.ahead = ahead
+        self.keep = max(keep, ahead)
+        self.resident = {}
+
+    def index_at(self, x) -> int:
+        return max(0, min(self.count - 1, int(x // self.chunk_width)))
+
+    def update(self, camera_x, view_width) -> bool:
+        """Nạp / bỏ chunk theo vị trí camera, trả về True nếu có thay đổi"""
+        first = self.index_at(camera_x)
+        last = self.index_at(camera_x + view_width - 1)
+        changed = False
+        for i in range(max(0, first - self.ahead), min(self.count - 1, last + self.ahead) + 1):
+            if i not in self.resident:
+                chunk = Chunk(i, i * self.chunk_width, min(self.world_width, (i + 1) * self.chunk_width))
+                self.resident[i] = chunk
+                if self.load is not None:
+                    self.load(chunk)
+                changed = True
+        for i in [i for i in self.resident if i < first - self.keep or i > last + self.keep]:
+            chunk = self.resident.pop(i)
+            if self.unload is not None:
+                self.unload(chunk)
+            changed = True
+        return changed
+
+    def is_resident(self, x) -> bool:
+        """Entity ở x chỉ được cập nhật / va chạm khi chunk chứa nó đang nạp"""
+        return self.index_at(x) in self.resident
+
+    def span(self):
+        """(trái, phải) của dải chunk đang nạp; chưa nạp chunk nào thì (0, 0)"""
+        if not self.resident:
+            return 0, 0
+        indices = self.resident.keys()
+        return self.resident[min(indices)].left, self.resident[max(indices)].right
+
+    def clear(self):
+        for chunk in self.resident.values():
+            if self.unload is not None:
+                self.unload(chunk)
+        self.resident.clear()